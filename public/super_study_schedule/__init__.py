@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Super Study Schedule: spreads Tanach (and optionally Mishnah) over the years
+# between a child's 5th and 10th Hebrew birthdays, exports the schedule as CSV
+# and ICS, and renders each day's text to LaTeX.
+#
+#     from super_study_schedule import build_schedule, render_latex
+#     schedule = build_schedule("2019-03-10", tracking_csv_path="tracking.csv")
+#     render_latex(schedule, "schedule.tex", corpus_path="corpus.bin")
+#
+# The public names below are resolved on first use, so importing the package
+# (or running `python -m super_study_schedule --help`) does not load pandas,
+# numpy, requests or tqdm until a command actually needs them.
+import importlib
+
+_EXPORTS = {
+    'study_paths': 'config', 'configure_logging': 'config', 'mount_drive': 'config',
+    'Track': 'distribution', 'balanced_day_offsets': 'distribution', 'distribute_items_balanced': 'distribution',
+    'HebrewCalendarIndex': 'hebcal', 'get_calendar_index': 'hebcal', 'hebrew_birthday_window': 'hebcal',
+    'build_schedule': 'schedule', 'build_multitrack_schedule_frame': 'schedule', 'build_track_items': 'schedule',
+    'default_tracks': 'schedule', 'load_tracking_sheet': 'schedule', 'write_schedule_files': 'schedule',
+    'TrackingSheet': 'tracking', 'load_tracking_columns': 'tracking',
+    'ScheduleTable': 'model', 'build_schedule_table': 'schedule',
+    'export_ics': 'ics', 'write_ics': 'ics',
+    'SefariaTextCache': 'sefaria', 'SefariaHttpClient': 'sefaria', 'get_sefaria_verse_entries': 'sefaria',
+    'prefetch_schedule_texts': 'sefaria',
+    'LocalCorpus': 'corpus', 'build_local_corpus': 'corpus',
+    'render_latex': 'latex', 'StreamingLatexWriter': 'latex',
+    'build_sharded_latex': 'shards', 'split_latex_shards': 'shards', 'compile_latex_shards': 'shards',
+    'METRICS': 'metrics', 'profile_run': 'metrics', 'write_metrics_report': 'metrics',
+    'generate_schedules_batch': 'batch',
+    'FakeSefariaServer': 'bench', 'run_benchmarks': 'bench',
+    'generate_schedule_csv': 'colab', 'generate_latex_source': 'colab',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
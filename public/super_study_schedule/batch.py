@@ -0,0 +1,102 @@
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .config import study_paths
+from .hebcal import get_calendar_index, hebrew_birthday_window
+from .schedule import (build_schedule_table, default_tracks, load_tracking_sheet, parse_iso_date,
+                       write_schedule_files)
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Batch Schedule Generation
+# --------------------------------
+# A roster CSV (name, birth_date, optional start_date) is turned into one
+# schedule CSV and ICS per child. The tracking sheet is read and flattened
+# once; the resulting tracks are handed to each worker process through the
+# pool initializer, so jobs only carry the roster row. Children get the same
+# defaults as generate_schedule_csv: start on the 5th Hebrew birthday unless
+# a start date is given, end on the 10th.
+BatchJob = namedtuple('BatchJob', ['name', 'birth_date', 'start_date'])
+BatchResult = namedtuple('BatchResult', ['name', 'birth_date', 'start_date', 'end_date', 'days',
+                                         'csv_path', 'ics_paths', 'seconds', 'error'])
+
+_batch_state = {}
+
+def read_roster(roster_path):
+    roster_df = pd.read_csv(roster_path, dtype=str, keep_default_na=False)
+    missing = {'name', 'birth_date'} - set(roster_df.columns)
+    if missing:
+        raise ValueError(f"Roster {roster_path} is missing columns: {sorted(missing)}")
+    start_dates = roster_df['start_date'] if 'start_date' in roster_df.columns else [""] * len(roster_df)
+    return [BatchJob(name.strip(), birth.strip(), start.strip())
+            for name, birth, start in zip(roster_df['name'], roster_df['birth_date'], start_dates)]
+
+def _init_batch_worker(tracks, output_dir, ics_mode):
+    _batch_state['tracks'] = tracks
+    _batch_state['output_dir'] = output_dir
+    _batch_state['ics_mode'] = ics_mode
+    _batch_state['calendar_index'] = get_calendar_index()
+
+def _generate_child_schedule(job):
+    started = time.perf_counter()
+    start_date = end_date = None
+    try:
+        birth_date = parse_iso_date(job.birth_date)
+        fifth_birthday, end_date = hebrew_birthday_window(birth_date, _batch_state['calendar_index'])
+        start_date = parse_iso_date(job.start_date) or fifth_birthday
+        schedule = build_schedule_table(_batch_state['tracks'], start_date, end_date)
+        csv_path, ics_paths = write_schedule_files(schedule, _batch_state['output_dir'], job.name,
+                                                   job.birth_date, ics_mode=_batch_state['ics_mode'])
+        return BatchResult(job.name, job.birth_date, start_date.date(), end_date.date(), len(schedule),
+                           csv_path, ics_paths, time.perf_counter() - started, None)
+    except Exception as e:
+        return BatchResult(job.name, job.birth_date, start_date and start_date.date(), end_date and end_date.date(),
+                           0, None, [], time.perf_counter() - started, f"{type(e).__name__}: {e}")
+
+def generate_schedules_batch(roster_path, tracking_csv_path=None, output_dir=None, include_mishnah=False,
+                             ics_mode="events", max_workers=None, summary_path=None):
+    batch_started = time.perf_counter()
+    output_dir = output_dir or study_paths().data_dir
+    jobs = read_roster(roster_path)
+    tracks = default_tracks(load_tracking_sheet(tracking_csv_path), include_mishnah)
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info(f"Batch: {len(jobs)} children, {sum(len(t.items) for t in tracks)} items "
+                f"indexed in {time.perf_counter() - batch_started:.2f}s")
+
+    if max_workers == 1:
+        # Run inline; handy for debugging and for very small rosters
+        _init_batch_worker(tracks, output_dir, ics_mode)
+        results = [_generate_child_schedule(job) for job in jobs]
+    else:
+        # Results are logged as they complete but kept in roster order
+        results = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker,
+                                 initargs=(tracks, output_dir, ics_mode)) as pool:
+            futures = {pool.submit(_generate_child_schedule, job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                result = future.result()
+                logger.debug(f"Batch: {result.name} done in {result.seconds:.2f}s")
+                results[futures[future]] = result
+    for result in results:
+        if result.error:
+            logger.error(f"Batch: {result.name} ({result.birth_date}) failed: {result.error}")
+
+    summary_df = pd.DataFrame(results, columns=BatchResult._fields)
+    summary_df['ics_paths'] = summary_df['ics_paths'].map(lambda paths: ";".join(paths))
+    if summary_path is None:
+        summary_path = os.path.join(output_dir, "batch_summary.csv")
+    summary_df.to_csv(summary_path, index=False)
+
+    wall = time.perf_counter() - batch_started
+    job_seconds = summary_df['seconds']
+    failed = int(summary_df['error'].notna().sum())
+    print(f"Batch finished: {len(results) - failed} succeeded, {failed} failed in {wall:.2f}s wall "
+          f"({job_seconds.sum():.2f}s of job time, mean {job_seconds.mean():.3f}s, max {job_seconds.max():.3f}s)")
+    print(f"Batch summary saved to: {summary_path}")
+    return results
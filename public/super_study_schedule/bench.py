@@ -0,0 +1,293 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from .config import study_paths
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Fake Sefaria API
+# --------------------------------
+# A local stand-in for https://www.sefaria.org/api/texts/ that answers whole
+# chapter, single verse and verse range requests with synthetic Hebrew text
+# (tags, entities and LaTeX specials included, so cleaning does real work).
+# Chapter lengths come from the tracking sheet. Each request waits `latency`
+# seconds, and a fixed share of references fail on their first attempt with
+# 429 (Retry-After: 0), 500, or a response slower than the client timeout.
+# Which references fail depends only on the reference and the seed, so every
+# run sees the same faults and makes the same number of requests.
+FAKE_REF_PATTERN = re.compile(r'^(.*) (\d+)(?::(\d+)(?:-(\d+))?)?$')
+
+def fake_verse_text(book, chapter, verse):
+    return (f"<b>{book}</b> פסוק {chapter}:{verse} &nbsp; בְּרֵאשִׁית בָּרָא אֱלֹהִים {{א}} & 50% "
+            f"<span class=\"mam-spi-pe\">{{\\u05e4}}</span> אֵת הַשָּׁמַיִם וְאֵת הָאָרֶץ")
+
+class FakeSefariaServer:
+    def __init__(self, chapter_lengths, latency=0.0, faults=None, timeout_delay=1.5, seed=0):
+        self.chapter_lengths = chapter_lengths
+        self.latency = latency
+        self.faults = dict(faults or {})
+        self.timeout_delay = timeout_delay
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.counts = {'requests': 0}
+        self.server = None
+
+    def fault_for(self, ref):
+        with self.lock:
+            attempt = self.attempts[ref] = self.attempts.get(ref, 0) + 1
+        if attempt > 1:
+            return None
+        bucket = zlib.crc32(f"{self.seed}:{ref}".encode('utf-8')) % 10000 / 10000
+        for kind in ('429', '500', 'timeout'):
+            rate = self.faults.get(kind, 0.0)
+            if bucket < rate:
+                return kind
+            bucket -= rate
+        return None
+
+    def payload(self, ref):
+        match = FAKE_REF_PATTERN.match(ref)
+        if match is None:
+            return None
+        book, chapter = match.group(1), int(match.group(2))
+        n_verses = self.chapter_lengths.get((book, chapter))
+        if n_verses is None:
+            return None
+        if match.group(3) is None:
+            return {'he': [fake_verse_text(book, chapter, v) for v in range(1, n_verses + 1)], 'sections': [chapter]}
+        first = int(match.group(3))
+        if match.group(4) is None:
+            return {'he': fake_verse_text(book, chapter, first), 'sections': [chapter, first]}
+        last = min(int(match.group(4)), n_verses)
+        return {'he': [fake_verse_text(book, chapter, v) for v in range(first, last + 1)],
+                'sections': [chapter, first]}
+
+    def count(self, key):
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                ref = unquote(self.path.split('?')[0]).split('/api/texts/', 1)[-1]
+                if fake.latency:
+                    time.sleep(fake.latency)
+                fault = fake.fault_for(ref)
+                if fault == 'timeout':
+                    fake.count('timeout')
+                    time.sleep(fake.timeout_delay)
+                if fault in ('429', '500'):
+                    fake.count(fault)
+                    self.send_response(int(fault))
+                    if fault == '429':
+                        self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                data = fake.payload(ref)
+                if data is None:
+                    fake.count('404')
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if fault is None:
+                    fake.count('200')
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}/api/texts/"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+# --------------------------------
+# Pipeline Benchmarks
+# --------------------------------
+# Each scenario builds a schedule from the tracking sheet, writes its CSV and
+# ICS, and renders it to LaTeX through the fake API with a fresh Sefaria
+# cache, the way the notebook does but headless. The whole Bible track is
+# always spread over the scenario's days, so `books` limits the small
+# scenario to a few books to keep its request count small too. Every
+# scenario runs in its own freshly spawned process so peak RSS is measured
+# per scenario and no warm caches carry over. Results are compared against a
+# stored baseline: wall time and peak RSS may grow by `tolerance` (plus a
+# little absolute slack for short runs), request counts not at all, since
+# faults are deterministic.
+BenchScenario = namedtuple('BenchScenario', ['name', 'days', 'books', 'latency', 'faults'])
+
+BENCH_FAULTS = {'429': 0.02, '500': 0.01, 'timeout': 0.005}
+BENCH_SCENARIOS = (
+    BenchScenario('small', 30, ('Genesis', 'Ruth'), 0.005, BENCH_FAULTS),
+    BenchScenario('five_year', 1827, None, 0.005, BENCH_FAULTS),
+    BenchScenario('multi_decade', 30 * 365 + 7, None, 0.002, BENCH_FAULTS),
+)
+BENCH_REQUEST_TIMEOUT = 1.0
+BENCH_START_DATE = datetime(2030, 1, 1)
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+def peak_rss_kb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS, KiB elsewhere
+
+def run_scenario(scenario, tracking_csv_path, work_dir):
+    from .distribution import Track
+    from .latex import render_latex
+    from .schedule import build_schedule, load_tracking_sheet, write_schedule_files
+    from .tracking import VerseRefs
+    # Retries are expected here; only errors are worth printing.
+    logging.getLogger().setLevel(logging.ERROR)
+    METRICS.reset()
+    os.makedirs(work_dir, exist_ok=True)
+    sheet = load_tracking_sheet(tracking_csv_path)
+    chapter_lengths = {(sheet.book_names[book], int(chapter)): int(verses)
+                       for book, chapter, verses in zip(sheet.chapters['book'], sheet.chapters['chapter'],
+                                                        sheet.chapters['verses'])}
+    books, chapters, verses = sheet.verse_ids('Bible')
+    if scenario.books:
+        keep = [sheet.book_names.index(book) for book in scenario.books]
+        mask = (books[:, None] == keep).any(axis=1)
+        books, chapters, verses = books[mask], chapters[mask], verses[mask]
+    tracks = [Track('Bible', VerseRefs(sheet.book_names, books, chapters, verses))]
+    server = FakeSefariaServer(chapter_lengths, latency=scenario.latency, faults=scenario.faults,
+                               timeout_delay=BENCH_REQUEST_TIMEOUT * 1.5)
+    api_url = server.start()
+    timings = {}
+    try:
+        t0 = time.perf_counter()
+        end_date = BENCH_START_DATE + timedelta(days=scenario.days - 1)
+        schedule = build_schedule("2025-01-01", start=BENCH_START_DATE, end=end_date, tracks=tracks, as_table=True)
+        timings['schedule_seconds'] = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        write_schedule_files(schedule, work_dir, "Bench", "2025-01-01")
+        timings['files_seconds'] = time.perf_counter() - t1
+        t2 = time.perf_counter()
+        tex_path = os.path.join(work_dir, "bench.tex")
+        rendered = render_latex(schedule, tex_path, cache_path=os.path.join(work_dir, "sefaria_cache.sqlite"),
+                                api_url=api_url, requests_per_second=None, request_timeout=BENCH_REQUEST_TIMEOUT)
+        timings['latex_seconds'] = time.perf_counter() - t2
+        timings['wall_seconds'] = time.perf_counter() - t0
+    finally:
+        server.stop()
+    if rendered is None:
+        raise RuntimeError(f"Benchmark '{scenario.name}' did not produce a LaTeX file")
+    with open(tex_path, 'rb') as f:
+        tex_sha256 = hashlib.sha256(f.read()).hexdigest()
+    metrics = METRICS.report()
+    return {
+        'scenario': scenario.name,
+        'days': len(schedule),
+        **{name: round(seconds, 3) for name, seconds in timings.items()},
+        'peak_rss_kb': peak_rss_kb(),
+        'server_requests': dict(server.counts),
+        'client_requests': metrics['counters'].get('http_requests', 0),
+        'tex_bytes': os.path.getsize(tex_path),
+        'tex_sha256': tex_sha256,
+        'stages': metrics['stages'],
+    }
+
+def compare_to_baseline(results, baseline, tolerance=0.25, slack_seconds=0.5, slack_kb=16384):
+    # Returns a list of regressions (empty if none).
+    regressions = []
+    for result in results:
+        base = baseline.get(result['scenario'])
+        if base is None:
+            continue
+        name = result['scenario']
+        if result['wall_seconds'] > base['wall_seconds'] * (1 + tolerance) + slack_seconds:
+            regressions.append(f"{name}: wall {result['wall_seconds']:.2f}s vs baseline {base['wall_seconds']:.2f}s")
+        if result['peak_rss_kb'] > base['peak_rss_kb'] * (1 + tolerance) + slack_kb:
+            regressions.append(f"{name}: peak RSS {result['peak_rss_kb']} KiB vs baseline {base['peak_rss_kb']} KiB")
+        if result['client_requests'] > base['client_requests']:
+            regressions.append(f"{name}: {result['client_requests']} requests vs baseline {base['client_requests']}")
+        if result['days'] != base['days']:
+            regressions.append(f"{name}: {result['days']} days vs baseline {base['days']}")
+    return regressions
+
+def run_benchmarks(scenarios=None, tracking_csv_path=None, baseline_path=DEFAULT_BASELINE_PATH,
+                   update_baseline=False, tolerance=0.25, report_path=None, work_dir=None):
+    # Returns (results, regressions). With update_baseline the results replace
+    # the stored baseline instead of being checked against it.
+    tracking_csv_path = os.path.abspath(tracking_csv_path or study_paths().tracking_csv)
+    selected = [s for s in BENCH_SCENARIOS if scenarios is None or s.name in scenarios]
+    unknown = set(scenarios or ()) - {s.name for s in BENCH_SCENARIOS}
+    if unknown:
+        raise ValueError(f"Unknown benchmark scenarios: {sorted(unknown)}")
+    root = work_dir or tempfile.mkdtemp(prefix='sss_bench_')
+    results = []
+    try:
+        for scenario in selected:
+            scenario_dir = os.path.join(root, scenario.name)
+            shutil.rmtree(scenario_dir, ignore_errors=True)
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(run_scenario, scenario, tracking_csv_path, scenario_dir).result()
+            results.append(result)
+            requests = result['server_requests']
+            logger.info(f"{scenario.name}: {result['days']} days in {result['wall_seconds']:.2f}s "
+                        f"(schedule {result['schedule_seconds']:.2f}s, files {result['files_seconds']:.2f}s, "
+                        f"latex {result['latex_seconds']:.2f}s), peak RSS {result['peak_rss_kb'] / 1024:.0f} MiB, "
+                        f"{requests['requests']} requests "
+                        f"({', '.join(f'{k}: {v}' for k, v in sorted(requests.items()) if k != 'requests')})")
+    finally:
+        if work_dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    regressions = []
+    if update_baseline:
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path, 'r') as f:
+                baseline = json.load(f)
+        baseline.update({r['scenario']: {k: r[k] for k in ('days', 'wall_seconds', 'peak_rss_kb', 'client_requests')}
+                         for r in results})
+        with open(baseline_path, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        logger.info(f"Baseline saved to: {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, 'r') as f:
+            regressions = compare_to_baseline(results, json.load(f), tolerance=tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+    else:
+        logger.warning(f"No baseline at {baseline_path}; run with update_baseline=True to create one")
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump({'results': results, 'regressions': regressions}, f, indent=2)
+    return results, regressions
@@ -0,0 +1,179 @@
+import argparse
+import logging
+import os
+import sys
+
+from .config import configure_logging, study_paths
+from .metrics import METRICS, profile_run, write_metrics_report
+
+# --------------------------------
+# Command Line Interface
+# --------------------------------
+# python -m super_study_schedule <command> ...
+# Each command imports only the modules it needs, so `--help` and small jobs
+# never load requests or tqdm, and only the schedule commands load pandas.
+def cmd_schedule(args, paths):
+    from .schedule import build_schedule, parse_iso_date, write_schedule_files
+    birth_date = parse_iso_date(args.birth_date)
+    schedule = build_schedule(birth_date, start=args.start, end=args.end,
+                              tracking_csv_path=args.tracking_csv or paths.tracking_csv,
+                              include_mishnah=args.mishnah, as_table=True)
+    output_dir = args.output_dir or paths.data_dir
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path, ics_paths = write_schedule_files(schedule, output_dir, args.name, birth_date.strftime("%Y-%m-%d"),
+                                               ics_mode=None if args.ics_mode == "none" else args.ics_mode,
+                                               ics_chunk_days=args.ics_chunk_days, incremental=args.incremental)
+    print(csv_path)
+    for ics_path in ics_paths:
+        print(ics_path)
+    return 0
+
+def cmd_latex(args, paths):
+    from .latex import render_latex
+    cache_path = None if args.no_cache else (args.cache or paths.sefaria_cache)
+    tex_path = render_latex(args.csv, args.output, cache_path=cache_path, offline=args.offline,
+                            cache_ttl_seconds=args.cache_ttl, cache_max_entries=args.cache_max_entries,
+                            prefetch=args.prefetch, max_workers=args.workers,
+                            requests_per_second=args.requests_per_second, corpus_path=args.corpus,
+                            incremental=args.incremental)
+    if tex_path is None:
+        return 1
+    print(tex_path)
+    if args.shard_by:
+        from .shards import build_sharded_latex
+        print(build_sharded_latex(args.csv, tex_path, output_dir=args.shard_dir, by=args.shard_by,
+                                  compile_pdf=args.compile, engine=args.engine, max_workers=args.compile_workers))
+    return 0
+
+def cmd_prefetch(args, paths):
+    from .sefaria import SefariaHttpClient, SefariaTextCache, prefetch_schedule_texts
+    client = SefariaHttpClient(max_workers=args.workers, requests_per_second=args.requests_per_second)
+    try:
+        with SefariaTextCache(args.cache or paths.sefaria_cache, ttl_seconds=args.cache_ttl) as cache:
+            summary = prefetch_schedule_texts(args.csv, cache, client=client, max_workers=args.workers)
+    finally:
+        client.stats.log_summary()
+        client.close()
+    print(f"{summary['requests']} requests: {summary['fetched']} fetched, {summary['failed']} failed")
+    return 1 if summary['failed'] else 0
+
+def cmd_batch(args, paths):
+    from .batch import generate_schedules_batch
+    results = generate_schedules_batch(args.roster, tracking_csv_path=args.tracking_csv or paths.tracking_csv,
+                                       output_dir=args.output_dir or paths.data_dir, include_mishnah=args.mishnah,
+                                       ics_mode=None if args.ics_mode == "none" else args.ics_mode,
+                                       max_workers=args.workers)
+    return 1 if any(result.error for result in results) else 0
+
+def cmd_corpus(args, paths):
+    from .corpus import build_local_corpus
+    print(build_local_corpus(args.export_dir, args.tracking_csv or paths.tracking_csv, args.output))
+    return 0
+
+def cmd_bench(args, paths):
+    from .bench import DEFAULT_BASELINE_PATH, run_benchmarks
+    _, regressions = run_benchmarks(args.scenario, tracking_csv_path=args.tracking_csv or paths.tracking_csv,
+                                    baseline_path=args.baseline or DEFAULT_BASELINE_PATH,
+                                    update_baseline=args.update_baseline, tolerance=args.tolerance,
+                                    report_path=args.report, work_dir=args.work_dir)
+    return 1 if regressions else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="super_study_schedule",
+                                     description="Build Tanach/Mishnah study schedules and render them to LaTeX.")
+    parser.add_argument("--data-dir", help="directory for the tracking sheet, cache and outputs "
+                                           "(default: $SUPER_STUDY_SCHEDULE_DIR or /content/drive/MyDrive)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug messages")
+    parser.add_argument("--metrics", help="write per-stage timings and counters as JSON to this path")
+    parser.add_argument("--profile", help="run under cProfile and save the stats to this path")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="trace allocations with tracemalloc and add the peak to the metrics")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    schedule = commands.add_parser("schedule", help="write one child's schedule CSV and ICS")
+    schedule.add_argument("name")
+    schedule.add_argument("birth_date", help="Gregorian birth date, YYYY-MM-DD")
+    schedule.add_argument("--start", help="start date (default: 5th Hebrew birthday)")
+    schedule.add_argument("--end", help="end date (default: 10th Hebrew birthday)")
+    schedule.add_argument("--mishnah", action="store_true", help="add a Mishnah track")
+    schedule.add_argument("--tracking-csv")
+    schedule.add_argument("--output-dir")
+    schedule.add_argument("--ics-mode", choices=("events", "recurring", "none"), default="events")
+    schedule.add_argument("--ics-chunk-days", type=int)
+    schedule.add_argument("--incremental", action="store_true",
+                          help="keep unchanged events (and their DTSTAMP) from the previous incremental export")
+    schedule.set_defaults(handler=cmd_schedule)
+
+    latex = commands.add_parser("latex", help="render a schedule CSV to a LaTeX source file")
+    latex.add_argument("csv")
+    latex.add_argument("output", help="path of the .tex file to write")
+    latex.add_argument("--corpus", help="local corpus file; Sefaria is not contacted when given")
+    latex.add_argument("--cache", help="Sefaria cache path (default: <data-dir>/sefaria_cache.sqlite)")
+    latex.add_argument("--no-cache", action="store_true")
+    latex.add_argument("--offline", action="store_true", help="use only cached Sefaria texts")
+    latex.add_argument("--cache-ttl", type=float, metavar="SECONDS",
+                       help="refetch cached texts older than this and evict them after the run")
+    latex.add_argument("--cache-max-entries", type=int, metavar="N",
+                       help="after the run, keep only the N most recently used cache entries")
+    latex.add_argument("--prefetch", action="store_true", help="warm the cache before rendering")
+    latex.add_argument("--workers", type=int, default=8)
+    latex.add_argument("--requests-per-second", type=float, default=5.0)
+    latex.add_argument("--incremental", action="store_true",
+                       help="re-render only days that changed since the previous incremental build of OUTPUT")
+    latex.add_argument("--shard-by", choices=("month", "book"),
+                       help="also split OUTPUT into per-month or per-book volumes plus a master document")
+    latex.add_argument("--shard-dir", help="directory for the shards (default: OUTPUT without .tex + _<shard-by>)")
+    latex.add_argument("--compile", action="store_true", help="compile the shard volumes in parallel into a PDF")
+    latex.add_argument("--engine", default="xelatex")
+    latex.add_argument("--compile-workers", type=int, help="parallel LaTeX processes (default: CPU count)")
+    latex.set_defaults(handler=cmd_latex)
+
+    prefetch = commands.add_parser("prefetch", help="warm the Sefaria cache for a schedule CSV without rendering")
+    prefetch.add_argument("csv")
+    prefetch.add_argument("--cache", help="Sefaria cache path (default: <data-dir>/sefaria_cache.sqlite)")
+    prefetch.add_argument("--cache-ttl", type=float, metavar="SECONDS", help="refetch cached texts older than this")
+    prefetch.add_argument("--workers", type=int, default=8)
+    prefetch.add_argument("--requests-per-second", type=float, default=5.0)
+    prefetch.set_defaults(handler=cmd_prefetch)
+
+    batch = commands.add_parser("batch", help="write schedules for every child in a roster CSV")
+    batch.add_argument("roster", help="CSV with name, birth_date and optional start_date columns")
+    batch.add_argument("--mishnah", action="store_true")
+    batch.add_argument("--tracking-csv")
+    batch.add_argument("--output-dir")
+    batch.add_argument("--ics-mode", choices=("events", "recurring", "none"), default="events")
+    batch.add_argument("--workers", type=int)
+    batch.set_defaults(handler=cmd_batch)
+
+    corpus = commands.add_parser("corpus", help="build a local corpus from a Sefaria export")
+    corpus.add_argument("export_dir")
+    corpus.add_argument("output")
+    corpus.add_argument("--tracking-csv")
+    corpus.set_defaults(handler=cmd_corpus)
+
+    bench = commands.add_parser("bench", help="benchmark the whole pipeline against a local fake Sefaria API")
+    bench.add_argument("--scenario", action="append", choices=("small", "five_year", "multi_decade"),
+                       help="scenario to run (repeatable; default: all)")
+    bench.add_argument("--tracking-csv")
+    bench.add_argument("--baseline", help="baseline JSON (default: bench_baseline.json in the package)")
+    bench.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    bench.add_argument("--tolerance", type=float, default=0.25, help="allowed relative growth in time and memory")
+    bench.add_argument("--report", help="write all results as JSON to this path")
+    bench.add_argument("--work-dir", help="keep the generated files here instead of a temporary directory")
+    bench.set_defaults(handler=cmd_bench)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO)
+    METRICS.reset()
+    try:
+        with profile_run(args.profile, trace_memory=args.trace_memory):
+            return args.handler(args, study_paths(args.data_dir))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        METRICS.log_summary()
+        if args.metrics:
+            write_metrics_report(args.metrics, {'command': args.command})
@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from .config import mount_drive, study_paths
+from .distribution import Track
+from .hebcal import HEBREW_MONTH_NAMES, get_calendar_index, hebrew_birthday_window
+from .ics import export_ics
+from .latex import render_latex
+from .metrics import METRICS, stage, write_metrics_report
+from .schedule import build_schedule_table, build_track_items, load_tracking_sheet, schedule_file_stem
+from .sefaria import SEFARIA_API_URL
+from .shards import build_sharded_latex
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Colab Notebook Flow
+# --------------------------------
+# The interactive steps behind the notebook's two cells: prompt for a child
+# and write their schedule CSV/ICS, then render the LaTeX source. Files go to
+# the data directory (Google Drive by default, see config.study_paths).
+
+def generate_schedule_csv(include_mishnah=False, extra_tracks=(), data_dir=None):
+    # Mount Drive at the start (run once per session)
+    mount_drive(force_remount=True)
+    paths = study_paths(data_dir)
+    METRICS.reset()
+
+    # -------------------------------------------
+    # Prompt for child's name and birth date
+    # -------------------------------------------
+    child_name = input("Enter the child's name: ").strip()
+    user_birth_date_str = input("Enter the child's Gregorian birth date (YYYY-MM-DD): ").strip()
+    try:
+        birth_year, birth_month, birth_day = map(int, user_birth_date_str.split('-'))
+        birth_date_gregorian = datetime(birth_year, birth_month, birth_day)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return None
+
+    # -------------------------------------------
+    # Convert birth date to Hebrew and display it
+    # -------------------------------------------
+    calendar_index = get_calendar_index()
+    h_year, h_month, h_day = calendar_index.from_gregorian(birth_year, birth_month, birth_day)
+    hebrew_month_names = HEBREW_MONTH_NAMES
+    child_hebrew_birth = f"{h_day} {hebrew_month_names.get(h_month, str(h_month))} {h_year}"
+    print(f"\nChild's Hebrew birth date: {child_hebrew_birth}")
+
+    # -------------------------------------------
+    # Calculate 5th and 10th Hebrew birthdays
+    # -------------------------------------------
+    fifth_hebrew_year = h_year + 5
+    tenth_hebrew_year = h_year + 10
+
+    fifth_birthday_gregorian, tenth_birthday_gregorian = hebrew_birthday_window(birth_date_gregorian, calendar_index)
+
+    fifth_birthday_hebrew = f"{h_day} {hebrew_month_names.get(h_month, str(h_month))} {fifth_hebrew_year}"
+    tenth_birthday_hebrew = f"{h_day} {hebrew_month_names.get(h_month, str(h_month))} {tenth_hebrew_year}"
+
+    print(f"5th Hebrew birthday: Gregorian: {fifth_birthday_gregorian.date()} / Hebrew: {fifth_birthday_hebrew}")
+    print(f"10th Hebrew birthday: Gregorian: {tenth_birthday_gregorian.date()} / Hebrew: {tenth_birthday_hebrew}\n")
+
+    # -------------------------------------------
+    # Check child's current age (approximate)
+    # -------------------------------------------
+    today = datetime.now()
+    age_in_years = (today - birth_date_gregorian).days // 365  # rough approximation
+    print(f"Child's approximate Gregorian age: {age_in_years} years")
+
+    # -------------------------------------------
+    # Determine schedule START date
+    # -------------------------------------------
+    if age_in_years >= 5:
+        print("Child is older than 5.")
+        use_custom = input("Do you want to specify a custom Gregorian start date? (Y/N): ").strip().lower()
+        if use_custom.startswith('y'):
+            custom_start_str = input("Enter your desired start date (YYYY-MM-DD): ").strip()
+            try:
+                y, m, d = map(int, custom_start_str.split('-'))
+                START_DATE = datetime(y, m, d)
+                print(f"Using user-specified start date: {START_DATE.date()}")
+            except ValueError:
+                print("Invalid custom date. Using 5th Hebrew birthday instead.")
+                START_DATE = fifth_birthday_gregorian
+        else:
+            START_DATE = fifth_birthday_gregorian
+            print(f"Using 5th Hebrew birthday as start: {START_DATE.date()}")
+    else:
+        START_DATE = fifth_birthday_gregorian
+        print(f"Child is younger than 5. Start date = 5th Hebrew birthday ({START_DATE.date()})")
+
+    # -------------------------------------------
+    # End date always = 10th Hebrew birthday
+    # -------------------------------------------
+    END_DATE = tenth_birthday_gregorian
+    print(f"End date = 10th Hebrew birthday ({END_DATE.date()})\n")
+
+    # -------------------------------------------
+    # Load the tracking sheet CSV from Drive
+    # -------------------------------------------
+    file_path = paths.tracking_csv
+    try:
+        data_df = load_tracking_sheet(file_path)
+    except FileNotFoundError:
+        print(f"Error: Could not find file at {file_path}")
+        return None
+
+    # -------------------------------------------
+    # Bible track, plus Mishnah and any extra tracks if requested
+    # -------------------------------------------
+    tracks = [Track('Bible', build_track_items(data_df, 'Bible'))]
+    if include_mishnah:
+        tracks.append(Track('Mishnah', build_track_items(data_df, 'Mishnah')))
+    tracks.extend(extra_tracks)
+
+    # -------------------------------------------
+    # Build the schedule table, distributing each track
+    # evenly across its window between START_DATE and END_DATE
+    # -------------------------------------------
+    schedule = build_schedule_table(tracks, START_DATE, END_DATE)
+    schedule_df = schedule.to_frame()
+
+    # -------------------------------------------
+    # Save the schedule CSV to Drive
+    # -------------------------------------------
+    stem = os.path.join(paths.data_dir, schedule_file_stem(child_name, user_birth_date_str))
+    out_csv = f"{stem}.csv"
+    schedule_df.to_csv(out_csv, index=False)
+    print(f"Schedule CSV saved to: {out_csv}\n")
+    print("Preview of the schedule:")
+    print(schedule_df.head())
+
+    # -------------------------------------------
+    # Save metadata for next cell
+    # -------------------------------------------
+    metadata = {"csv_path": out_csv}
+    metadata_file = paths.metadata
+    with open(metadata_file, 'w') as f:
+        json.dump(metadata, f)
+    print(f"Metadata saved to: {metadata_file}")
+
+    # -------------------------------------------
+    # Generate ICS file
+    # -------------------------------------------
+    ics_path = f"{stem}.ics"
+    export_ics(schedule, ics_path, child_name)
+    print(f"ICS file saved to: {ics_path}\n")
+    write_metrics_report(paths.schedule_metrics)
+
+    return out_csv  # Return the path explicitly
+
+def generate_latex_source(csv_file_path=None, cache_path=None, offline=False,
+                          cache_ttl_seconds=None, cache_max_entries=None, prefetch=False, api_url=SEFARIA_API_URL,
+                          max_workers=8, requests_per_second=5.0, lookahead=None,
+                          checkpoint_every_rows=25, checkpoint_every_seconds=30.0, corpus_path=None,
+                          data_dir=None, incremental=False, shard_by=None, compile_pdf=False):
+    # Mount Drive
+    mount_drive(force_remount=True)
+    paths = study_paths(data_dir)
+    os.makedirs(paths.data_dir, exist_ok=True)
+    METRICS.reset()
+    # The cache lives in the data directory unless a path is given; pass
+    # cache_path=False to fetch without one.
+    if cache_path is None:
+        cache_path = paths.sefaria_cache
+
+    # Get CSV path from metadata if not provided
+    metadata_file = paths.metadata
+    if csv_file_path is None and os.path.exists(metadata_file):
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+        csv_file_path = metadata.get('csv_path')
+    if not csv_file_path or not os.path.exists(csv_file_path):
+        logger.error("No valid CSV path provided or found in metadata.")
+        return
+
+    logger.info(f"Reading schedule CSV from: {csv_file_path}")
+    try:
+        with stage('csv_load'):
+            df = pd.read_csv(csv_file_path)
+        logger.debug(f"Processing total {len(df)} rows.")
+    except Exception as e:
+        logger.error(f"Failed to read CSV: {e}")
+        return
+
+    # The checkpoint keeps a fixed name so a rerun after a disconnect resumes it.
+    # Incremental builds update one output.tex in place instead of adding a
+    # new timestamped file each time.
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    final_tex_file_path = os.path.join(paths.data_dir, "output.tex" if incremental else f"output_{timestamp}.tex")
+    if render_latex(df, final_tex_file_path, checkpoint_path=paths.latex_checkpoint,
+                    progress_path=paths.latex_progress, cache_path=cache_path, offline=offline,
+                    cache_ttl_seconds=cache_ttl_seconds, cache_max_entries=cache_max_entries,
+                    prefetch=prefetch, api_url=api_url,
+                    max_workers=max_workers, requests_per_second=requests_per_second, lookahead=lookahead,
+                    checkpoint_every_rows=checkpoint_every_rows, checkpoint_every_seconds=checkpoint_every_seconds,
+                    corpus_path=corpus_path, incremental=incremental) is None:
+        return
+
+    print("LaTeX source file generated successfully.")
+    print(f"File saved to: {final_tex_file_path}")
+
+    # Optionally split the book into per-month or per-book volumes that compile in parallel.
+    if shard_by:
+        master_path = build_sharded_latex(df, final_tex_file_path, by=shard_by, compile_pdf=compile_pdf)
+        print(f"Sharded LaTeX master saved to: {master_path}")
+    METRICS.log_summary()
+    write_metrics_report(paths.latex_metrics)
@@ -0,0 +1,50 @@
+import logging
+import os
+from collections import namedtuple
+
+# --------------------------------
+# Paths
+# --------------------------------
+# Every file the notebook reads or writes lives in one data directory. It
+# defaults to the Colab Drive folder and can be moved with the
+# SUPER_STUDY_SCHEDULE_DIR environment variable or the CLI's --data-dir.
+COLAB_DATA_DIR = "/content/drive/MyDrive"
+TRACKING_SHEET_NAME = "Parsha Tracking Sheet - Chapters of Tanach and Mishnah.csv"
+
+StudyPaths = namedtuple('StudyPaths', ['data_dir', 'tracking_csv', 'sefaria_cache', 'metadata',
+                                       'latex_checkpoint', 'latex_progress', 'schedule_metrics', 'latex_metrics'])
+
+def study_paths(data_dir=None):
+    data_dir = data_dir or os.environ.get('SUPER_STUDY_SCHEDULE_DIR') or COLAB_DATA_DIR
+    return StudyPaths(
+        data_dir=data_dir,
+        tracking_csv=os.path.join(data_dir, TRACKING_SHEET_NAME),
+        sefaria_cache=os.path.join(data_dir, "sefaria_cache.sqlite"),
+        metadata=os.path.join(data_dir, "schedule_metadata.json"),
+        latex_checkpoint=os.path.join(data_dir, "latex_checkpoint.tex"),
+        latex_progress=os.path.join(data_dir, "latex_progress.json"),
+        schedule_metrics=os.path.join(data_dir, "schedule_metrics.json"),
+        latex_metrics=os.path.join(data_dir, "latex_metrics.json"),
+    )
+
+# --------------------------------
+# Setup Logging
+# --------------------------------
+def configure_logging(level=logging.INFO):
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+# --------------------------------
+# Google Drive
+# --------------------------------
+def mount_drive(force_remount=False):
+    # Mounts Drive when running in Colab; does nothing anywhere else.
+    try:
+        from google.colab import drive
+    except ImportError:
+        return False
+    drive.mount('/content/drive', force_remount=force_remount)
+    return True
@@ -0,0 +1,158 @@
+import glob
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+
+import numpy as np
+
+from .sefaria import parse_verse_ref
+from .text import clean_verse_texts
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Local Corpus Store
+# --------------------------------
+# build_local_corpus imports a downloaded Sefaria export (the Sefaria-Export
+# repository's json/**/Hebrew/merged.json files) into one compact file: a JSON
+# header listing every book and chapter, an int64 array of byte offsets (one
+# per verse), and a single UTF-8 blob of cleaned verse text. LocalCorpus maps
+# the file into memory and finds any verse with one dict lookup and one slice,
+# so generate_latex_source can render with no network access at all.
+CORPUS_MAGIC = b'SSCORP1\n'
+
+# Tracking sheet book names that differ from Sefaria titles.
+SEFARIA_TITLES = {
+    'Berachot': 'Mishnah Berakhot', 'Damai': 'Mishnah Demai', 'Kilaim': 'Mishnah Kilayim',
+    'Maserot': 'Mishnah Maasrot', 'Maser Sheni': 'Mishnah Maaser Sheni', 'Chalah': 'Mishnah Challah',
+    'Bikurim': 'Mishnah Bikkurim', 'Psachim': 'Mishnah Pesachim', 'Rosh HaShanah': 'Mishnah Rosh Hashanah',
+    'Megilah': 'Mishnah Megillah', 'Moed Kattan': 'Mishnah Moed Katan', 'Chaggigah': 'Mishnah Chagigah',
+    'Kidushin': 'Mishnah Kiddushin', 'Makot': 'Mishnah Makkot', 'Avodah Zara': 'Mishnah Avodah Zarah',
+    'Avot': 'Pirkei Avot', 'Horyot': 'Mishnah Horayot', 'Bechorot': 'Mishnah Bekhorot',
+    'Erchin': 'Mishnah Arakhin', 'Ohalot': 'Mishnah Oholot', 'Taharot': 'Mishnah Tahorot',
+    'Machshirin': 'Mishnah Makhshirin', 'Uktzim': 'Mishnah Oktzin',
+}
+
+def find_sefaria_export_texts(export_dir):
+    texts = {}
+    for path in glob.glob(os.path.join(export_dir, '**', 'Hebrew', 'merged.json'), recursive=True):
+        # The book title is the directory above "Hebrew".
+        texts[os.path.basename(os.path.dirname(os.path.dirname(path)))] = path
+    return texts
+
+def build_local_corpus(export_dir, tracking_csv_path, corpus_path, data_types=('Bible', 'Mishnah')):
+    import pandas as pd
+    sheet = pd.read_csv(tracking_csv_path, usecols=['Data Type', 'Book', 'Chapter', 'Number of Verses or Mishnahs'])
+    sheet = sheet[sheet['Data Type'].isin(data_types)]
+    export_texts = find_sefaria_export_texts(export_dir)
+    books = []
+    offsets = [0]
+    tmp_blob = corpus_path + '.blob'
+    with open(tmp_blob, 'wb') as blob:
+        for book, rows in sheet.groupby('Book', sort=False):
+            title = SEFARIA_TITLES.get(book, book)
+            path = export_texts.get(title) or export_texts.get(f"Mishnah {book}")
+            if path is None:
+                logger.warning(f"'{title}' not found in Sefaria export at {export_dir}")
+                text = []
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = json.load(f).get('text', [])
+            chapters = [int(c) for c in rows['Chapter']]
+            verse_counts = []
+            for chapter, expected in zip(chapters, rows['Number of Verses or Mishnahs']):
+                verses = text[chapter - 1] if chapter - 1 < len(text) and isinstance(text[chapter - 1], list) else []
+                if len(verses) != expected:
+                    logger.warning(f"{book} {chapter}: export has {len(verses)} verses, tracking sheet lists {expected}")
+                for verse_text in clean_verse_texts([v if isinstance(v, str) else '' for v in verses]):
+                    data = verse_text.encode('utf-8')
+                    blob.write(data)
+                    offsets.append(offsets[-1] + len(data))
+                verse_counts.append(len(verses))
+            books.append({'name': book, 'chapters': chapters, 'verse_counts': verse_counts})
+    header = json.dumps({'books': books, 'verses': len(offsets) - 1}, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-(len(CORPUS_MAGIC) + 8 + len(header)) % 8)  # keep the offsets array 8-byte aligned
+    tmp_path = corpus_path + '.tmp'
+    with open(tmp_path, 'wb') as f, open(tmp_blob, 'rb') as blob:
+        f.write(CORPUS_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(np.asarray(offsets, dtype='<i8').tobytes())
+        shutil.copyfileobj(blob, f)
+    os.replace(tmp_path, corpus_path)
+    os.remove(tmp_blob)
+    logger.info(f"Wrote {len(offsets) - 1} verses from {len(books)} books to {corpus_path}")
+    return corpus_path
+
+class LocalCorpus:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(CORPUS_MAGIC)] != CORPUS_MAGIC:
+            raise ValueError(f"{path} is not a local corpus file")
+        (header_len,) = struct.unpack_from('<Q', self.map, len(CORPUS_MAGIC))
+        header_start = len(CORPUS_MAGIC) + 8
+        header = json.loads(bytes(self.map[header_start:header_start + header_len]))
+        n_verses = header['verses']
+        offsets_start = header_start + header_len
+        self.offsets = np.frombuffer(self.map, dtype='<i8', count=n_verses + 1, offset=offsets_start)
+        self.blob_start = offsets_start + 8 * (n_verses + 1)
+        # (book, chapter) -> (index of verse 1, number of verses)
+        self.chapters = {}
+        base = 0
+        for book in header['books']:
+            for chapter, count in zip(book['chapters'], book['verse_counts']):
+                self.chapters[(book['name'], chapter)] = (base, count)
+                base += count
+
+    def verse_text(self, book, chapter, verse):
+        base, count = self.chapters.get((book, chapter), (0, 0))
+        if not 1 <= verse <= count:
+            return None
+        i = base + verse - 1
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.map[self.blob_start + start:self.blob_start + end].decode('utf-8')
+
+    def verse_entries(self, ref):
+        # Same (book, chapter, verse, text) entries as
+        # get_sefaria_verse_entries(ref, with_book=True), read from the corpus.
+        # ref is a comma-separated string or a sequence of single references.
+        verse_entries = []
+        for single_ref in (ref.split(',') if isinstance(ref, str) else ref):
+            single_ref = single_ref.strip()
+            if not single_ref:
+                continue
+            parsed = parse_verse_ref(single_ref)
+            text = self.verse_text(*parsed) if parsed is not None else None
+            if text is None:
+                logger.error(f"'{single_ref}' is not in the local corpus {self.path}")
+                continue
+            verse_entries.append(parsed + (text,))
+        return verse_entries
+
+    def parsed_verse_entries(self, parsed_refs):
+        # The same entries for already parsed (book, chapter, verse) references,
+        # e.g. VerseRefs.parsed(), with no reference strings involved.
+        verse_entries = []
+        for book, chapter, verse in parsed_refs:
+            text = self.verse_text(book, chapter, verse)
+            if text is None:
+                logger.error(f"'{book} {chapter}:{verse}' is not in the local corpus {self.path}")
+                continue
+            verse_entries.append((book, chapter, verse, text))
+        return verse_entries
+
+    def close(self):
+        self.offsets = None
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
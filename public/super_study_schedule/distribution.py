@@ -0,0 +1,100 @@
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# --------------------------------
+# Verse Distribution Engine
+# --------------------------------
+# Spreading N items over D days by giving each day ceil(remaining / days_left)
+# always works out to the first N % D days getting N // D + 1 items and the
+# rest getting N // D. Day k therefore starts at k * (N // D) + min(k, N % D),
+# so every boundary is computed directly instead of re-slicing the list.
+def balanced_day_offsets(n_items, n_days):
+    if n_days <= 0:
+        return np.zeros(1, dtype=np.int64)
+    base, extra = divmod(int(n_items), int(n_days))
+    days = np.arange(n_days + 1, dtype=np.int64)
+    return days * base + np.minimum(days, extra)
+
+def distribute_items_balanced(items, start_date, end_date):
+    # Returns one index range per day; slice `items` with it only when needed.
+    n_days = (end_date - start_date).days + 1
+    offsets = balanced_day_offsets(len(items), n_days).tolist()
+    return [range(offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1)]
+
+def distribute_items_balanced_legacy(items, start_date, end_date):
+    # Original re-slicing implementation, kept as the reference for benchmarks.
+    distributed = []
+    current_date = start_date
+    while current_date <= end_date:
+        days_left = (end_date - current_date).days + 1
+        if days_left <= 0:
+            break
+        items_today = int(np.ceil(len(items) / days_left))
+        distributed.append(items[:items_today])
+        items = items[items_today:]
+        current_date += timedelta(days=1)
+    return distributed
+
+def benchmark_distribution(sizes=(1_000, 10_000, 100_000, 1_000_000), n_days=1826, legacy_limit=100_000):
+    start_date = datetime(2020, 1, 1)
+    end_date = start_date + timedelta(days=n_days - 1)
+    results = []
+    for size in sizes:
+        items = [f"item {i}" for i in range(size)]
+        t0 = time.perf_counter()
+        ranges = distribute_items_balanced(items, start_date, end_date)
+        engine_s = time.perf_counter() - t0
+        legacy_s = None
+        if size <= legacy_limit:
+            t0 = time.perf_counter()
+            legacy = distribute_items_balanced_legacy(items, start_date, end_date)
+            legacy_s = time.perf_counter() - t0
+            if [len(r) for r in ranges] != [len(day) for day in legacy]:
+                raise AssertionError(f"Per-day counts differ from legacy distribution for {size} items")
+        results.append({"items": size, "days": n_days, "engine_s": engine_s, "legacy_s": legacy_s})
+        legacy_str = f"{legacy_s:.4f}s" if legacy_s is not None else "skipped"
+        print(f"{size:>9} items / {n_days} days: engine {engine_s:.4f}s, legacy {legacy_str}")
+    return results
+
+# --------------------------------
+# Multi-Track Scheduling
+# --------------------------------
+# Each track (Bible, Mishnah or a user-defined list of items) is spread over
+# its own date window, clipped to the schedule's range, and becomes a
+# "<name>" / "<name> Count" column pair. A track's weight is a per-weekday
+# load, given as a {day name: weight} dict or seven weights starting Monday;
+# a weight of 0 leaves that weekday free. A single number is not accepted,
+# because every track has to finish inside its own window whatever its size.
+# Tracks without weights are split exactly like distribute_items_balanced.
+Track = namedtuple('Track', ['name', 'items', 'start_date', 'end_date', 'weight'], defaults=(None, None, None))
+
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+def weighted_day_offsets(n_items, day_weights):
+    day_weights = np.asarray(day_weights, dtype=float)
+    if len(day_weights) and day_weights[0] > 0 and np.all(day_weights == day_weights[0]):
+        return balanced_day_offsets(n_items, len(day_weights))
+    total = day_weights.sum()
+    if total <= 0:
+        raise ValueError("Track weights leave no study days in its window")
+    cumulative = np.concatenate(([0.0], np.cumsum(day_weights)))
+    offsets = np.rint(n_items * cumulative / total).astype(np.int64)
+    offsets[-1] = n_items
+    return offsets
+
+def track_day_weights(track, dates):
+    if track.weight is None:
+        return np.ones(len(dates))
+    if isinstance(track.weight, dict):
+        unknown = set(track.weight) - set(WEEKDAY_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown weekday names in weights for track '{track.name}': {sorted(unknown)}")
+        by_weekday = [track.weight.get(name, 1.0) for name in WEEKDAY_NAMES]
+    else:
+        by_weekday = list(track.weight)
+        if len(by_weekday) != 7:
+            raise ValueError(f"Track '{track.name}' needs a {{weekday: weight}} dict or 7 weekday weights")
+    return np.asarray(by_weekday, dtype=float)[dates.weekday]
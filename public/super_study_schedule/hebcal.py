@@ -0,0 +1,159 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from convertdate import hebrew
+
+from .metrics import timed
+
+# --------------------------------
+# Hebrew Calendar Index
+# --------------------------------
+# Hebrew dates for a whole range of Gregorian days are precomputed into
+# contiguous arrays indexed by day ordinal, so converting a date (or a whole
+# date column) is an array lookup instead of convertdate's per-call arithmetic.
+# The reverse direction uses a per-year table of month start ordinals, built
+# with the same month order and lengths convertdate uses, so out-of-range days
+# such as 30 Heshvan in a short year roll over exactly like hebrew.to_gregorian.
+JD_ORDINAL_OFFSET = 1721424.5  # Julian day of proleptic Gregorian ordinal 0
+UNIX_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+HEBREW_MONTH_NAMES = {
+    1: 'ניסן', 2: 'אייר', 3: 'סיון', 4: 'תמוז', 5: 'אב', 6: 'אלול',
+    7: 'תשרי', 8: 'חשון', 9: 'כסלו', 10: 'טבת', 11: 'שבט', 12: 'אדר', 13: 'אדר ב'
+}
+
+class HebrewCalendarIndex:
+    def __init__(self, start=datetime(1900, 1, 1), end=datetime(2200, 12, 31)):
+        self.start_ordinal = start.toordinal()
+        self.end_ordinal = end.toordinal()
+        first_year = hebrew.from_gregorian(start.year, start.month, start.day)[0]
+        last_year = hebrew.from_gregorian(end.year, end.month, end.day)[0]
+        self.first_year = first_year
+        self.year_start = np.zeros(last_year - first_year + 2, dtype=np.int64)
+        self.month_offsets = np.zeros((last_year - first_year + 1, 14), dtype=np.int64)
+        months, days, years = [], [], []
+        for i, year in enumerate(range(first_year, last_year + 1)):
+            self.year_start[i] = int(hebrew.to_jd(year, hebrew.TISHRI, 1) - JD_ORDINAL_OFFSET)
+            n_months = hebrew.year_months(year)
+            order = list(range(hebrew.TISHRI, n_months + 1)) + list(range(hebrew.NISAN, hebrew.TISHRI))
+            lengths = [hebrew.month_length(year, m) for m in order]
+            offset = 0
+            for month, length in zip(order, lengths):
+                self.month_offsets[i, month] = offset
+                offset += length
+            if n_months == hebrew.ADAR:
+                # convertdate places a non-leap year's Adar II at the start of Nisan.
+                self.month_offsets[i, hebrew.VEADAR] = self.month_offsets[i, hebrew.NISAN]
+            months.append(np.repeat(order, lengths))
+            days.append(np.concatenate([np.arange(1, length + 1) for length in lengths]))
+            years.append(np.full(offset, year))
+        self.year_start[-1] = int(hebrew.to_jd(last_year + 1, hebrew.TISHRI, 1) - JD_ORDINAL_OFFSET)
+        skip = self.start_ordinal - int(self.year_start[0])
+        size = self.end_ordinal - self.start_ordinal + 1
+        self.h_year = np.concatenate(years)[skip:skip + size].astype(np.int32)
+        self.h_month = np.concatenate(months)[skip:skip + size].astype(np.int8)
+        self.h_day = np.concatenate(days)[skip:skip + size].astype(np.int8)
+
+    def __contains__(self, ordinal):
+        return self.start_ordinal <= ordinal <= self.end_ordinal
+
+    def from_gregorian(self, year, month, day):
+        ordinal = datetime(year, month, day).toordinal()
+        if ordinal not in self:
+            return hebrew.from_gregorian(year, month, day)
+        i = ordinal - self.start_ordinal
+        return int(self.h_year[i]), int(self.h_month[i]), int(self.h_day[i])
+
+    def to_gregorian(self, h_year, h_month, h_day):
+        i = h_year - self.first_year
+        if not 0 <= i < len(self.month_offsets):
+            return hebrew.to_gregorian(h_year, h_month, h_day)
+        date = datetime.fromordinal(int(self.year_start[i] + self.month_offsets[i, h_month]) + h_day - 1)
+        return date.year, date.month, date.day
+
+    def from_ordinals(self, ordinals):
+        # Bulk conversion; every ordinal must fall inside the index range.
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        if len(ordinals) and (ordinals.min() < self.start_ordinal or ordinals.max() > self.end_ordinal):
+            raise ValueError("Dates fall outside the Hebrew calendar index range")
+        i = ordinals - self.start_ordinal
+        return self.h_year[i], self.h_month[i], self.h_day[i]
+
+    def from_dates(self, dates):
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        return self.from_ordinals(days + UNIX_EPOCH_ORDINAL)
+
+    def to_ordinals(self, h_years, h_months, h_days):
+        i = np.asarray(h_years, dtype=np.int64) - self.first_year
+        if len(i) and (i.min() < 0 or i.max() >= len(self.month_offsets)):
+            raise ValueError("Hebrew years fall outside the Hebrew calendar index range")
+        return self.year_start[i] + self.month_offsets[i, np.asarray(h_months)] + np.asarray(h_days) - 1
+
+def parse_schedule_dates(date_strs):
+    # Schedule CSVs use YYYY-MM-DD; older exports used M/D/YYYY. Anything else is NaT.
+    import pandas as pd
+    date_strs = pd.Series(date_strs, dtype=object).reset_index(drop=True)
+    iso = date_strs.str.contains('-', regex=False, na=False)
+    us = date_strs.str.contains('/', regex=False, na=False) & ~iso
+    parsed = pd.Series(pd.NaT, index=date_strs.index, dtype='datetime64[ns]')
+    parsed[iso] = pd.to_datetime(date_strs[iso], format='%Y-%m-%d', errors='coerce')
+    parsed[us] = pd.to_datetime(date_strs[us], format='%m/%d/%Y', errors='coerce')
+    return parsed
+
+@timed('date_conversion')
+def hebrew_date_fields(date_strs, index=None):
+    # One (year, month, day, h_year, h_month, h_day) tuple per date string, or
+    # None where the string could not be parsed.
+    index = index or get_calendar_index()
+    parsed = parse_schedule_dates(date_strs)
+    fields = [None] * len(parsed)
+    valid = parsed.notna().to_numpy()
+    if not valid.any():
+        return fields
+    dates = parsed[valid]
+    ordinals = dates.to_numpy(dtype='datetime64[D]').astype(np.int64) + UNIX_EPOCH_ORDINAL
+    in_range = (ordinals >= index.start_ordinal) & (ordinals <= index.end_ordinal)
+    h_year = np.zeros(len(ordinals), dtype=np.int64)
+    h_month = np.zeros(len(ordinals), dtype=np.int64)
+    h_day = np.zeros(len(ordinals), dtype=np.int64)
+    h_year[in_range], h_month[in_range], h_day[in_range] = index.from_ordinals(ordinals[in_range])
+    for i in np.flatnonzero(~in_range):
+        date = datetime.fromordinal(int(ordinals[i]))
+        h_year[i], h_month[i], h_day[i] = hebrew.from_gregorian(date.year, date.month, date.day)
+    rows = zip(dates.dt.year.tolist(), dates.dt.month.tolist(), dates.dt.day.tolist(),
+               h_year.tolist(), h_month.tolist(), h_day.tolist())
+    for position, row in zip(np.flatnonzero(valid).tolist(), rows):
+        fields[position] = row
+    return fields
+
+@lru_cache(maxsize=None)
+def get_calendar_index(start_year=1900, end_year=2200):
+    return HebrewCalendarIndex(datetime(start_year, 1, 1), datetime(end_year, 12, 31))
+
+def verify_calendar_index(index=None, step=1):
+    # Checks every `step`-th day of the index against convertdate in both directions.
+    index = index or get_calendar_index()
+    mismatches = 0
+    for ordinal in range(index.start_ordinal, index.end_ordinal + 1, step):
+        date = datetime.fromordinal(ordinal)
+        expected = hebrew.from_gregorian(date.year, date.month, date.day)
+        if index.from_gregorian(date.year, date.month, date.day) != expected:
+            mismatches += 1
+        if index.to_gregorian(*expected) != (date.year, date.month, date.day):
+            mismatches += 1
+    for h_year in range(index.first_year, index.first_year + len(index.month_offsets)):
+        for h_month in range(1, 14):
+            for h_day in (1, 29, 30):
+                if index.to_gregorian(h_year, h_month, h_day) != hebrew.to_gregorian(h_year, h_month, h_day):
+                    mismatches += 1
+    return mismatches
+
+@timed('date_conversion')
+def hebrew_birthday_window(birth_date, calendar_index=None):
+    # Gregorian dates of the 5th and 10th Hebrew birthdays
+    calendar_index = calendar_index or get_calendar_index()
+    h_year, h_month, h_day = calendar_index.from_gregorian(birth_date.year, birth_date.month, birth_date.day)
+    fifth = datetime(*calendar_index.to_gregorian(h_year + 5, h_month, h_day))
+    tenth = datetime(*calendar_index.to_gregorian(h_year + 10, h_month, h_day))
+    return fifth, tenth
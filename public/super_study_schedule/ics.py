@@ -0,0 +1,184 @@
+import logging
+import mmap
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .incremental import content_key, load_manifest, save_manifest
+from .metrics import timed
+from .model import ScheduleTable
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# ICS Export
+# --------------------------------
+# Events are streamed straight to the output file from the schedule's columns.
+# DTSTAMP is computed once per calendar and DTEND dates are derived for the
+# whole column at once. Text values are escaped and long lines folded at 75
+# octets as RFC 5545 requires. mode="recurring" writes one daily RRULE series
+# whose occurrences are overridden per date, and chunk_days splits a long
+# schedule into several smaller calendar files. The schedule may be a
+# ScheduleTable, whose day texts are joined straight from its items, or a
+# DataFrame with the CSV's columns.
+ICS_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n', '\r': ''})
+
+def escape_ics_text(text):
+    return text.translate(ICS_TEXT_ESCAPES)
+
+def fold_ics_line(line):
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Never split inside a multi-byte UTF-8 sequence.
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+def schedule_track_names(schedule_df):
+    if isinstance(schedule_df, ScheduleTable):
+        return list(schedule_df.tracks)
+    return [c for c in schedule_df.columns if f"{c} Count" in schedule_df.columns]
+
+def schedule_track_texts(schedule_df, name):
+    if isinstance(schedule_df, ScheduleTable):
+        return schedule_df.day_texts(name)
+    return schedule_df[name].fillna("").tolist()
+
+def ics_date_range(schedule_df):
+    # (DTSTART, DTEND) date strings for every day.
+    if isinstance(schedule_df, ScheduleTable):
+        days = schedule_df.dates
+        return ([d.replace('-', '') for d in np.datetime_as_string(days, unit='D').tolist()],
+                [d.replace('-', '') for d in np.datetime_as_string(days + 1, unit='D').tolist()])
+    dates = pd.to_datetime(schedule_df['Date'], format="%Y-%m-%d")
+    return (dates.dt.strftime("%Y%m%d").tolist(),
+            (dates + pd.Timedelta(days=1)).dt.strftime("%Y%m%d").tolist())
+
+def schedule_row_ids(schedule_df):
+    if isinstance(schedule_df, ScheduleTable):
+        return range(schedule_df.first_index, schedule_df.first_index + len(schedule_df))
+    return schedule_df.index.tolist()
+
+def slice_schedule(schedule_df, start, stop):
+    if isinstance(schedule_df, ScheduleTable):
+        return schedule_df.slice_days(start, stop)
+    return schedule_df.iloc[start:stop]
+
+def ics_descriptions(schedule_df):
+    track_names = schedule_track_names(schedule_df)
+    if track_names == ['Bible']:
+        return schedule_track_texts(schedule_df, 'Bible')
+    # One line per track that has something scheduled that day.
+    track_texts = [schedule_track_texts(schedule_df, name) for name in track_names]
+    return ["\n" + "\n".join(f"{name}: {text}" for name, text in zip(track_names, day) if text)
+            for day in zip(*track_texts)] if track_names else [""] * len(schedule_df)
+
+def ics_event_parts(schedule_df, child_name):
+    # One (before DTSTAMP, after DTSTAMP) pair of text per day in "events"
+    # mode, generated as the calendar is written.
+    dtstarts, dtends = ics_date_range(schedule_df)
+    uid_prefix = child_name.replace(' ', '_')
+    summary = fold_ics_line(f"SUMMARY:{escape_ics_text(f'{child_name} Schedule')}")
+    return (("BEGIN:VEVENT\r\n" + f"UID:{uid_prefix}_{dtstart}_{index}@study_schedule\r\n",
+             f"DTSTART;VALUE=DATE:{dtstart}\r\nDTEND;VALUE=DATE:{dtend}\r\n" + summary +
+             fold_ics_line(f"DESCRIPTION:{escape_ics_text(f'Learn: {description}')}") + "END:VEVENT\r\n")
+            for index, dtstart, dtend, description in zip(schedule_row_ids(schedule_df), dtstarts, dtends,
+                                                          ics_descriptions(schedule_df)))
+
+def write_ics(schedule_df, f, child_name, mode="events", dtstamp=None, prodid="-//Study Schedule//EN"):
+    if dtstamp is None:
+        dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    stamp = f"DTSTAMP:{dtstamp}\r\n"
+
+    f.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{prodid}\r\n")
+    if mode == "recurring" and len(schedule_df):
+        dtstarts, dtends = ics_date_range(schedule_df)
+        descriptions = ics_descriptions(schedule_df)
+        summary = fold_ics_line(f"SUMMARY:{escape_ics_text(f'{child_name} Schedule')}")
+        uid_prefix = child_name.replace(' ', '_')
+        uid = f"UID:{uid_prefix}_{dtstarts[0]}_series@study_schedule\r\n"
+        f.write("BEGIN:VEVENT\r\n" + uid + stamp +
+                f"DTSTART;VALUE=DATE:{dtstarts[0]}\r\nDTEND;VALUE=DATE:{dtends[0]}\r\n"
+                f"RRULE:FREQ=DAILY;COUNT={len(dtstarts)}\r\n" + summary + "END:VEVENT\r\n")
+        for dtstart, dtend, description in zip(dtstarts, dtends, descriptions):
+            f.write("BEGIN:VEVENT\r\n" + uid + stamp +
+                    f"RECURRENCE-ID;VALUE=DATE:{dtstart}\r\n"
+                    f"DTSTART;VALUE=DATE:{dtstart}\r\nDTEND;VALUE=DATE:{dtend}\r\n" + summary +
+                    fold_ics_line(f"DESCRIPTION:{escape_ics_text(f'Learn: {description}')}") + "END:VEVENT\r\n")
+    elif mode in ("events", "recurring"):
+        for head, tail in ics_event_parts(schedule_df, child_name):
+            f.write(head + stamp + tail)
+    else:
+        raise ValueError(f"Unknown ICS mode: {mode}")
+    f.write("END:VCALENDAR\r\n")
+
+@timed('ics_export')
+def export_ics(schedule_df, ics_path, child_name, mode="events", chunk_days=None, incremental=False):
+    # Returns the list of files written; with chunk_days the calendar is split
+    # into <name>_part01.ics, <name>_part02.ics, ... of at most chunk_days events.
+    dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    if incremental:
+        if mode != "events" or (chunk_days and len(schedule_df) > chunk_days):
+            raise ValueError("Incremental ICS export needs mode='events' and a single file")
+        export_ics_incremental(schedule_df, ics_path, child_name, dtstamp)
+        return [ics_path]
+    if not chunk_days or len(schedule_df) <= chunk_days:
+        chunks = [(ics_path, schedule_df)]
+    else:
+        stem, ext = os.path.splitext(ics_path)
+        chunks = [(f"{stem}_part{n + 1:02d}{ext or '.ics'}", slice_schedule(schedule_df, start, start + chunk_days))
+                  for n, start in enumerate(range(0, len(schedule_df), chunk_days))]
+    for path, chunk in chunks:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            write_ics(chunk, f, child_name, mode=mode, dtstamp=dtstamp)
+    return [path for path, _ in chunks]
+
+def export_ics_incremental(schedule_df, ics_path, child_name, dtstamp, prodid="-//Study Schedule//EN"):
+    # Events whose text (everything but DTSTAMP) matches an event in the
+    # previous build's manifest are copied byte for byte, keeping their old
+    # DTSTAMP, so calendar clients only see the days that actually changed.
+    parts = list(ics_event_parts(schedule_df, child_name))
+    keys = [content_key(head, tail) for head, tail in parts]
+    manifest = load_manifest(ics_path, 'ics', prodid)
+    previous_spans = {key: (start, end) for key, start, end in manifest['entries']} if manifest else {}
+    stamp = f"DTSTAMP:{dtstamp}\r\n"
+    tmp_path = f"{ics_path}.tmp"
+    entries = []
+    reused = 0
+    previous_file = open(ics_path, 'rb') if manifest else None
+    previous = None
+    try:
+        if previous_file is not None:
+            previous = mmap.mmap(previous_file.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(tmp_path, 'wb') as f:
+            offset = f.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{prodid}\r\n".encode('utf-8'))
+            for key, (head, tail) in zip(keys, parts):
+                span = previous_spans.get(key)
+                if span is not None:
+                    data = previous[span[0]:span[1]]
+                    reused += 1
+                else:
+                    data = (head + stamp + tail).encode('utf-8')
+                entries.append([key, offset, offset + len(data)])
+                offset += f.write(data)
+            f.write(b"END:VCALENDAR\r\n")
+    finally:
+        if previous is not None:
+            previous.close()
+        if previous_file is not None:
+            previous_file.close()
+    os.replace(tmp_path, ics_path)
+    save_manifest(ics_path, 'ics', entries, prodid)
+    logger.info(f"Incremental ICS: {reused} of {len(parts)} events unchanged in {ics_path}")
+    return reused
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Build Manifests
+# --------------------------------
+# Every LaTeX and ICS build writes <output>.manifest.json next to its output.
+# It records a content hash per day (date plus references) and where that
+# day's bytes sit in the output file. An incremental build compares the new
+# schedule's hashes against it and copies unchanged days straight from the
+# previous output, so only changed days are fetched and rendered again. The
+# manifest also stores the SHA-256 of the output it describes; if the output
+# was changed or replaced afterwards the manifest is ignored and the build
+# starts from scratch.
+MANIFEST_VERSION = 1
+
+def atomic_write_json(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def manifest_path_for(output_path):
+    return f"{output_path}.manifest.json"
+
+def content_key(*parts):
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(output_path, kind, fingerprint=None):
+    # Returns the manifest for output_path, or None if it is missing, was
+    # written by another kind of build or settings (fingerprint), or no longer
+    # matches the output file on disk.
+    path = manifest_path_for(output_path)
+    if not os.path.exists(path) or not os.path.exists(output_path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+        return None
+    if (manifest.get('version') != MANIFEST_VERSION or manifest.get('kind') != kind
+            or manifest.get('fingerprint') != fingerprint):
+        logger.info(f"Manifest {path} was written with different settings; rebuilding from scratch")
+        return None
+    if manifest.get('sha256') != file_sha256(output_path):
+        logger.warning(f"{output_path} changed since its manifest was written; rebuilding from scratch")
+        return None
+    return manifest
+
+def save_manifest(output_path, kind, entries, fingerprint=None):
+    # Written after the output is in place, so a crash in between leaves a
+    # manifest whose checksum no longer matches and is therefore ignored.
+    atomic_write_json(manifest_path_for(output_path), {
+        'version': MANIFEST_VERSION,
+        'kind': kind,
+        'fingerprint': fingerprint,
+        'sha256': file_sha256(output_path),
+        'entries': entries,
+    })
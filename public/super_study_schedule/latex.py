@@ -0,0 +1,578 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import signal
+import struct
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from .config import study_paths
+from .corpus import LocalCorpus
+from .hebcal import HEBREW_MONTH_NAMES, hebrew_date_fields
+from .incremental import atomic_write_json, content_key, load_manifest, save_manifest
+from .metrics import METRICS, count, stage, timed
+from .model import ScheduleTable, day_ref_bounds
+from .sefaria import (SEFARIA_API_URL, SefariaHttpClient, SefariaTextCache, fetch_ahead,
+                      get_sefaria_verse_entries, prefetch_schedule_texts)
+from .text import (HEBREW_BOOK_NAMES, escape_latex_special_chars, format_ref_span,
+                   latex_chapter_marker, latex_verse_marker)
+from .tracking import VerseRefs
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Streaming LaTeX Writer
+# --------------------------------
+# Each day's section is appended to the checkpoint file as soon as it is
+# rendered. The progress file records the row index and the byte offset the
+# file had after that row, so a resume truncates any partially written day and
+# keeps appending; nothing already on disk is rewritten.
+#
+# Progress is committed according to a CheckpointPolicy rather than after
+# every row. A commit fsyncs the .tex file first and only then atomically
+# replaces the progress file, so the recorded offset never points past data
+# that is actually on disk.
+#
+# The progress file also carries the build's fingerprint (a hash of every
+# day's content); a checkpoint left by a different schedule is discarded
+# instead of being resumed. For the build manifest, rows written with a
+# body_len record where they end and how long their verse body is. Those
+# spans go to an append-only sidecar (<progress file>.rows, two int64 per
+# row) that is fsynced with the .tex file; the progress file stores only how
+# many of them are committed, and a resume truncates the sidecar to that count.
+ROW_SPAN = struct.Struct('<qq')
+
+class CheckpointPolicy:
+    def __init__(self, every_rows=25, every_seconds=30.0):
+        self.every_rows = every_rows
+        self.every_seconds = every_seconds
+
+    def due(self, rows_pending, seconds_since_commit):
+        if rows_pending <= 0:
+            return False
+        if self.every_rows and rows_pending >= self.every_rows:
+            return True
+        return bool(self.every_seconds) and seconds_since_commit >= self.every_seconds
+
+class StreamingLatexWriter:
+    def __init__(self, path, progress_path, preamble, policy=None, fingerprint=None):
+        self.path = path
+        self.progress_path = progress_path
+        self.preamble = preamble
+        self.fingerprint = fingerprint
+        self.row_spans = []
+        self.spans_path = f"{progress_path}.rows"
+        self.spans_file = None
+        self.policy = policy or CheckpointPolicy()
+        self.file = None
+        self.offset = 0
+        self.last_idx = -1
+        self.rows_pending = 0
+        self.last_commit = time.monotonic()
+        self.commits = 0
+
+    def open(self):
+        progress = None
+        if os.path.exists(self.progress_path) and os.path.exists(self.path):
+            with open(self.progress_path, 'r') as f:
+                progress = json.load(f)
+        elif os.path.exists(self.progress_path):
+            logger.warning(f"Progress file found without {self.path}; starting from the first row.")
+        if progress is not None and self.fingerprint is not None and progress.get('fingerprint', self.fingerprint) != self.fingerprint:
+            logger.warning(f"{self.path} was written for a different schedule; starting from the first row.")
+            progress = None
+        if progress is not None:
+            self.row_spans = self.load_row_spans(progress.get('rows', 0))
+            if self.row_spans is None:
+                logger.warning(f"{self.spans_path} is missing committed rows; starting from the first row.")
+                progress = None
+        if progress is not None:
+            self.last_idx = progress.get('last_idx', -1)
+            # Progress files written before byte offsets were tracked cover the whole checkpoint.
+            self.offset = progress.get('offset', os.path.getsize(self.path))
+            self.file = open(self.path, 'r+b')
+            self.file.truncate(self.offset)
+            self.file.seek(self.offset)
+            logger.info(f"Resuming from row {self.last_idx + 1} at byte {self.offset}")
+        else:
+            self.file = open(self.path, 'wb')
+            self.last_idx = -1
+            self.offset = 0
+            self.row_spans = []
+            if os.path.exists(self.spans_path):
+                os.remove(self.spans_path)
+            self.append(self.preamble)
+            self.commit()
+        return self
+
+    def load_row_spans(self, rows):
+        # Committed spans from the sidecar (truncating uncommitted ones), or
+        # None if it holds fewer than the progress file counts. Older progress
+        # files stored the span list itself; it is moved to the sidecar.
+        if isinstance(rows, list):
+            with open(self.spans_path, 'wb') as f:
+                f.writelines(ROW_SPAN.pack(*span) for span in rows)
+            return rows
+        if not rows:
+            return []
+        size = rows * ROW_SPAN.size
+        if not os.path.exists(self.spans_path) or os.path.getsize(self.spans_path) < size:
+            return None
+        with open(self.spans_path, 'r+b') as f:
+            f.truncate(size)
+            data = f.read()
+        return [list(span) for span in ROW_SPAN.iter_unpack(data)]
+
+    @timed('checkpoint_io')
+    def append(self, text):
+        data = text.encode('utf-8') if isinstance(text, str) else text
+        self.file.write(data)
+        self.offset += len(data)
+
+    def write_row(self, idx, text, body_len=None):
+        self.append(text)
+        self.last_idx = idx
+        if body_len is not None:
+            self.row_spans.append([self.offset, body_len])
+            if self.spans_file is None:
+                self.spans_file = open(self.spans_path, 'ab')
+            self.spans_file.write(ROW_SPAN.pack(self.offset, body_len))
+        self.rows_pending += 1
+        if self.policy.due(self.rows_pending, time.monotonic() - self.last_commit):
+            self.commit()
+
+    @timed('checkpoint_io')
+    def commit(self):
+        if self.file is None:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.spans_file is not None:
+            self.spans_file.flush()
+            os.fsync(self.spans_file.fileno())
+        progress = {'last_idx': self.last_idx, 'offset': self.offset}
+        if self.fingerprint is not None:
+            progress.update({'fingerprint': self.fingerprint, 'rows': len(self.row_spans)})
+        atomic_write_json(self.progress_path, progress)
+        self.rows_pending = 0
+        self.last_commit = time.monotonic()
+        self.commits += 1
+        logger.debug(f"Checkpoint saved at row {self.last_idx} (byte {self.offset})")
+
+    def finish(self, final_path):
+        self.append("\\end{document}")
+        self.file.close()
+        self.file = None
+        shutil.move(self.path, final_path)
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        self.close()
+        if os.path.exists(self.spans_path):
+            os.remove(self.spans_path)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.spans_file is not None:
+            self.spans_file.close()
+            self.spans_file = None
+
+def benchmark_checkpoint_overhead(directory=None, rows=500, row_bytes=4000,
+                                  policies=((1, None), (25, None), (100, None))):
+    # Per-row cost of checkpointing a growing document in `directory`: the
+    # original full rewrite + progress file per row versus streaming appends
+    # committed under different CheckpointPolicy settings (every_rows, every_seconds).
+    directory = directory or study_paths().data_dir
+    row_text = ("\\noindent " + "א" * (row_bytes // 2))[:row_bytes // 2] + "\n"
+    bench_dir = tempfile.mkdtemp(prefix='checkpoint_bench_', dir=directory)
+    tex_path = os.path.join(bench_dir, 'bench.tex')
+    progress_path = os.path.join(bench_dir, 'bench_progress.json')
+    results = []
+    try:
+        t0 = time.perf_counter()
+        content = ""
+        for idx in range(rows):
+            content += row_text
+            with open(tex_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            with open(progress_path, 'w') as f:
+                json.dump({'last_idx': idx}, f)
+        elapsed = time.perf_counter() - t0
+        results.append({'mode': 'full rewrite per row', 'per_row_ms': elapsed / rows * 1000, 'commits': rows})
+        for every_rows, every_seconds in policies:
+            for path in (tex_path, progress_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            policy = CheckpointPolicy(every_rows=every_rows, every_seconds=every_seconds)
+            writer = StreamingLatexWriter(tex_path, progress_path, "", policy=policy).open()
+            t0 = time.perf_counter()
+            for idx in range(rows):
+                writer.write_row(idx, row_text)
+            writer.commit()
+            elapsed = time.perf_counter() - t0
+            writer.close()
+            mode = f"append, commit every {every_rows} rows"
+            if every_seconds:
+                mode += f" or {every_seconds}s"
+            results.append({'mode': mode,
+                            'per_row_ms': elapsed / rows * 1000, 'commits': writer.commits})
+    finally:
+        shutil.rmtree(bench_dir, ignore_errors=True)
+    for result in results:
+        print(f"{result['mode']:<45} {result['per_row_ms']:8.3f} ms/row  ({result['commits']} commits)")
+    return results
+
+# --------------------------------
+# LaTeX Rendering
+# --------------------------------
+HEBREW_DAY_NAMES = {
+    'Sunday': 'יום ראשון', 'Monday': 'יום שני', 'Tuesday': 'יום שלישי',
+    'Wednesday': 'יום רביעי', 'Thursday': 'יום חמישי', 'Friday': 'יום שישי',
+    'Saturday': 'שבת'
+}
+HEBREW_GREGORIAN_MONTHS = {
+    1: 'ינואר', 2: 'פברואר', 3: 'מרץ', 4: 'אפריל', 5: 'מאי', 6: 'יוני',
+    7: 'יולי', 8: 'אוגוסט', 9: 'ספטמבר', 10: 'אוקטובר', 11: 'נובמבר', 12: 'דצמבר'
+}
+
+LATEX_PREAMBLE = r"""
+\documentclass{article}
+\usepackage[utf8]{inputenc}
+\usepackage{fontspec}
+\usepackage{geometry}
+\geometry{a4paper, top=2cm, bottom=2cm, left=2cm, right=2cm}
+\usepackage{fancyhdr}
+\pagestyle{fancy}
+\fancyhf{}
+\rfoot{\thepage}
+\usepackage{hyperref}
+\usepackage{polyglossia}
+\usepackage{fancybox}
+\setmainlanguage{hebrew}
+\setotherlanguage{english}
+\makeatletter
+\providecommand{\bidi@Initialize}{}
+\makeatother
+\newfontfamily\hebrewfont[Script=Hebrew]{Ezra SIL}
+\newfontfamily\englishfont{Ezra SIL}
+\setmainfont{Ezra SIL}
+\begin{document}
+\tableofcontents
+\thispagestyle{empty}
+\newpage
+\setcounter{page}{1}
+""".strip() + "\n"
+
+def has_refs(refs):
+    return isinstance(refs, str) and bool(refs.strip())
+
+# Rows come from a ScheduleTable: each LatexRow holds the span of the day's
+# references in the table's Bible items (start, stop) instead of its own
+# reference strings. Headings format only the first and last reference, the
+# fetch formats (or, from a local corpus, reads by integer id) just the
+# day's slice, and the render loop never touches pandas.
+LatexRow = namedtuple('LatexRow', ['date', 'day_of_week', 'start', 'stop', 'date_fields'])
+
+def schedule_table(schedule):
+    # A ScheduleTable from a table, a DataFrame or a CSV path.
+    if isinstance(schedule, ScheduleTable):
+        return schedule
+    if not isinstance(schedule, pd.DataFrame):
+        with stage('csv_load'):
+            schedule = pd.read_csv(schedule)
+    return ScheduleTable.from_frame(schedule.reset_index(drop=True), track_names=['Bible'])
+
+def prepare_latex_rows(table):
+    if 'Bible' not in table.tracks:
+        raise ValueError("Schedule has no Bible track to render")
+    date_strs = table.date_strings()
+    offsets = table.tracks['Bible'].offsets.tolist()
+    return [LatexRow(*fields) for fields in zip(date_strs, table.weekday_names(), offsets[:-1], offsets[1:],
+                                                hebrew_date_fields(date_strs))]
+
+def latex_day_heading(date_str, day_of_week, refs, date_fields):
+    # Section title, subsection and TOC line for one day; refs holds the day's
+    # first and last reference (see day_ref_bounds) and date_fields its entry
+    # from hebrew_date_fields.
+    try:
+        if date_fields is None:
+            raise ValueError("expected YYYY-MM-DD or M/D/YYYY")
+        year, month, day, h_year, h_month, h_day = date_fields
+        gregorian_date_hebrew = f"{day} {HEBREW_GREGORIAN_MONTHS.get(month, str(month))} {year}"
+        hebrew_date = f"{h_day} {HEBREW_MONTH_NAMES.get(h_month, str(h_month))} {h_year}"
+        heb_day = HEBREW_DAY_NAMES.get(day_of_week, day_of_week)
+        section_title = f"\\fbox{{\\textbf{{{heb_day} - {hebrew_date} / {gregorian_date_hebrew}}}}}"
+        toc_entry = f"{hebrew_date} / {gregorian_date_hebrew}"
+        logger.debug(f"Converted date '{date_str}' to Hebrew date '{hebrew_date}', day '{heb_day}'.")
+    except Exception as e:
+        logger.error(f"Error converting date '{date_str}': {e}")
+        section_title = f"\\fbox{{\\textbf{{{date_str} - {day_of_week}}}}}"
+        toc_entry = f"{date_str}"
+
+    latex_content = f"\\section*{{{section_title}}}\n"
+
+    if refs:
+        display_bible_ref = format_ref_span(refs[0], refs[-1] if len(refs) > 1 else None)
+        toc_bible_ref = display_bible_ref
+    else:
+        display_bible_ref = "לא זמין"
+        toc_bible_ref = "לא זמין"
+        logger.debug("No valid Bible references found.")
+
+    latex_content += f"\\subsection*{{תנ\"ך: {display_bible_ref}}}\n"
+    latex_content += f"\\addcontentsline{{toc}}{{section}}{{\\small {toc_entry} — {toc_bible_ref}}}\n"
+    return latex_content
+
+def latex_day_body(ref_count, verse_entries):
+    # Verse text for one day; depends only on the day's references.
+    latex_content = ""
+    if ref_count:
+        logger.debug(f"Retrieved {len(verse_entries)} verses for {ref_count} references.")
+
+        # Each entry carries its book, so a change of book is a plain comparison.
+        formatted_text = ""
+        current_chapter = None
+        previous_book = verse_entries[0][0] if verse_entries else None
+
+        for i, (book, chapter_num, verse_num, verse_text) in enumerate(verse_entries):
+            if book != previous_book and i > 0:
+                formatted_text += f"\\vspace{{0.75em}}\\par\\noindent\\textbf{{{HEBREW_BOOK_NAMES.get(book, book)}}}\n"
+                current_chapter = None
+                previous_book = book
+            if current_chapter != chapter_num:
+                formatted_text += latex_chapter_marker(chapter_num)
+                current_chapter = chapter_num
+            verse_text_escaped = escape_latex_special_chars(verse_text)
+            formatted_text += f"{latex_verse_marker(verse_num)}{verse_text_escaped} "
+
+        latex_content += formatted_text + "\\par\n"
+    else:
+        logger.debug("Skipping verse retrieval since no references.")
+
+    latex_content += "\\vspace{1em}\n"
+    return latex_content
+
+def plan_latex_reuse(day_keys, refs_keys, manifest):
+    # For each row: None (render and fetch), ('day', start, end, body_len) to
+    # copy the whole section, or ('body', start, end, body_len) to re-render
+    # only the heading and copy the body bytes, e.g. when the same readings
+    # moved to another date.
+    if manifest is None:
+        return [None] * len(day_keys)
+    by_day = {}
+    by_refs = {}
+    for day_key, refs_key, start, end, body_len in manifest['entries']:
+        by_day.setdefault(day_key, ('day', start, end, body_len))
+        by_refs.setdefault(refs_key, ('body', end - body_len, end, body_len))
+    return [by_day.get(day_key) or by_refs.get(refs_key) for day_key, refs_key in zip(day_keys, refs_keys)]
+
+def render_latex(schedule, tex_path, checkpoint_path=None, progress_path=None, cache_path=None, offline=False,
+                 cache_ttl_seconds=None, cache_max_entries=None, prefetch=False, api_url=SEFARIA_API_URL,
+                 max_workers=8, requests_per_second=5.0, lookahead=None,
+                 checkpoint_every_rows=25, checkpoint_every_seconds=30.0, corpus_path=None,
+                 incremental=False, request_timeout=10):
+    # Renders a schedule (ScheduleTable, DataFrame or CSV path) to tex_path and
+    # returns the path, or None if the final file could not be written. An
+    # interrupted run resumes from checkpoint_path/progress_path, which default
+    # to files next to tex_path. Verse text comes from the local corpus at
+    # corpus_path if given, otherwise from Sefaria through the optional cache
+    # at cache_path; after an online run, entries older than cache_ttl_seconds
+    # and all but the cache_max_entries most recently used are evicted.
+    # With incremental=True the build writes a manifest, and days whose content
+    # is unchanged since the previous incremental build are copied from the
+    # existing tex_path instead of being fetched and rendered again.
+    from tqdm import tqdm
+    table = schedule_table(schedule)
+    checkpoint_path = checkpoint_path or f"{tex_path}.partial"
+    progress_path = progress_path or f"{tex_path}.progress.json"
+
+    # Day keys cover what a section is rendered from; refs keys only the verse
+    # body. The joined texts are dropped once the keys and prefetch list are built.
+    rows = prepare_latex_rows(table)
+    items = table.tracks['Bible'].items
+    refs_texts = table.day_texts('Bible')
+    refs_keys = [content_key(text) for text in refs_texts]
+    day_keys = [content_key(str(row.date), str(row.day_of_week), text) for row, text in zip(rows, refs_texts)]
+    manifest_fingerprint = content_key(LATEX_PREAMBLE)
+    manifest = load_manifest(tex_path, 'latex', manifest_fingerprint) if incremental else None
+    reuse = plan_latex_reuse(day_keys, refs_keys, manifest)
+    if incremental:
+        copied = sum(1 for r in reuse if r is not None and r[0] == 'day')
+        reheaded = sum(1 for r in reuse if r is not None and r[0] == 'body')
+        logger.info(f"Incremental build: {copied} days unchanged, {reheaded} moved to a new date, "
+                    f"{len(reuse) - copied - reheaded} to render")
+    build_fingerprint = content_key(manifest['sha256'] if manifest else "", *day_keys)
+
+    corpus = cache = client = None
+    try:
+        # With a local corpus every verse is read from disk and Sefaria is never contacted.
+        corpus = LocalCorpus(corpus_path) if corpus_path else None
+        if corpus is not None:
+            cache_path = None
+        cache = SefariaTextCache(cache_path, ttl_seconds=cache_ttl_seconds, max_entries=cache_max_entries,
+                                 offline=offline) if cache_path else None
+        client = SefariaHttpClient(max_workers=max_workers, requests_per_second=requests_per_second)
+        if cache is not None and prefetch and not offline:
+            to_fetch = pd.DataFrame({'Bible': [text for text, r in zip(refs_texts, reuse) if r is None]})
+            prefetch_schedule_texts(to_fetch, cache, timeout=request_timeout, api_url=api_url, client=client,
+                                    max_workers=max_workers)
+        del refs_texts
+
+        # The previous output stays untouched until the new one replaces it.
+        previous_file = open(tex_path, 'rb') if manifest is not None else None
+        previous = mmap.mmap(previous_file.fileno(), 0, access=mmap.ACCESS_READ) if previous_file else None
+
+        policy = CheckpointPolicy(every_rows=checkpoint_every_rows, every_seconds=checkpoint_every_seconds)
+        writer = StreamingLatexWriter(checkpoint_path, progress_path, LATEX_PREAMBLE, policy=policy,
+                                      fingerprint=build_fingerprint).open()
+        last_processed_idx = writer.last_idx
+
+        # SIGTERM (e.g. a Colab runtime shutdown) is turned into an exception so the
+        # rows rendered since the last commit are checkpointed before exiting.
+        def handle_sigterm(signum, frame):
+            raise SystemExit(f"Received signal {signum}")
+        previous_sigterm = None
+        if threading.current_thread() is threading.main_thread():
+            previous_sigterm = signal.signal(signal.SIGTERM, handle_sigterm)
+
+        # Verse text for upcoming rows is fetched on a thread pool while earlier
+        # rows are rendered; fetch_ahead yields results back in row order.
+        def fetch_row(idx):
+            start, stop = rows[idx].start, rows[idx].stop
+            if reuse[idx] is None and stop > start:
+                if corpus is not None and isinstance(items, VerseRefs):
+                    return corpus.parsed_verse_entries(items.parsed(start, stop))
+                if corpus is not None:
+                    return corpus.verse_entries(items[start:stop])
+                return get_sefaria_verse_entries(items[start:stop], timeout=request_timeout, cache=cache,
+                                                 api_url=api_url, chapter_granular=cache is not None, client=client,
+                                                 with_book=True)
+            return None
+
+        # Headings for every row still to render are built up front; copied days need none.
+        t0 = time.perf_counter()
+        headings = [None] * len(rows)
+        for idx in range(last_processed_idx + 1, len(rows)):
+            plan = reuse[idx]
+            if plan is None or plan[0] == 'body':
+                row = rows[idx]
+                headings[idx] = latex_day_heading(row.date, row.day_of_week, day_ref_bounds(items, row.start, row.stop),
+                                                  row.date_fields).encode('utf-8')
+        formatting_seconds = time.perf_counter() - t0
+
+        pending_rows = range(last_processed_idx + 1, len(rows))
+        fetched_rows = fetch_ahead(pending_rows, fetch_row, max_workers=max_workers, lookahead=lookahead)
+        rendered = reheaded = copied = 0
+        try:
+            for idx, verse_entries in tqdm(fetched_rows, total=len(rows), desc="Building LaTeX", ncols=100,
+                                           initial=last_processed_idx + 1):
+                plan = reuse[idx]
+                if plan is None:
+                    t0 = time.perf_counter()
+                    body = latex_day_body(rows[idx].stop - rows[idx].start, verse_entries).encode('utf-8')
+                    formatting_seconds += time.perf_counter() - t0
+                    rendered += 1
+                elif plan[0] == 'day':
+                    _, start, end, body_len = plan
+                    writer.write_row(idx, previous[start:end], body_len=body_len)
+                    copied += 1
+                    continue
+                else:
+                    _, start, end, _ = plan
+                    body = previous[start:end]
+                    reheaded += 1
+                writer.write_row(idx, headings[idx] + body, body_len=len(body) if incremental else None)
+        except BaseException:
+            writer.commit()
+            writer.close()
+            logger.warning(f"Interrupted; progress committed through row {writer.last_idx}")
+            raise
+        finally:
+            METRICS.add_time('latex_formatting', formatting_seconds, calls=rendered + reheaded)
+            count('rows_rendered', rendered)
+            count('rows_reheaded', reheaded)
+            count('rows_copied', copied)
+            if previous_sigterm is not None:
+                signal.signal(signal.SIGTERM, previous_sigterm)
+            if previous is not None:
+                previous.close()
+                previous_file.close()
+        writer.commit()
+
+        try:
+            writer.finish(tex_path)
+            logger.info(f"Final LaTeX file saved to: {tex_path}")
+            if incremental and len(writer.row_spans) == len(rows):
+                starts = [len(LATEX_PREAMBLE.encode('utf-8'))] + [end for end, _ in writer.row_spans[:-1]]
+                save_manifest(tex_path, 'latex', [
+                    [day_key, refs_key, start, end, body_len]
+                    for day_key, refs_key, start, (end, body_len)
+                    in zip(day_keys, refs_keys, starts, writer.row_spans)
+                ], manifest_fingerprint)
+            elif incremental:
+                logger.info("Resumed from a checkpoint without row spans; no manifest written")
+        except Exception as e:
+            logger.error(f"Failed to write final LaTeX file: {e}")
+            return None
+        finally:
+            writer.close()
+    finally:
+        # Runs after an interrupt or error as well as after a finished build.
+        if client is not None:
+            client.stats.log_summary()
+            client.close()
+        if corpus is not None:
+            corpus.close()
+        if cache is not None:
+            logger.info(f"Sefaria cache: {cache.hits} hits, {cache.misses} misses")
+            # Offline runs cannot refetch what they would evict.
+            if not offline:
+                cache.evict()
+            cache.close()
+    return tex_path
+
+def benchmark_row_overhead(schedule, repeat=3):
+    # Per-row CPU time outside the fetch, with verse text left out: the
+    # original iterrows loop (Series per row, references split for the heading
+    # and again for the body) versus ScheduleTable rows plus precomputed headings.
+    df = schedule if isinstance(schedule, pd.DataFrame) else pd.read_csv(schedule)
+    df = df.reset_index(drop=True)
+
+    def legacy():
+        date_fields = hebrew_date_fields(df['Date'])
+        out = []
+        for idx, row in df.iterrows():
+            bible_refs = row['Bible'] if pd.notna(row['Bible']) else ""
+            refs = tuple(r.strip() for r in bible_refs.split(",") if r.strip())
+            heading = latex_day_heading(row['Date'], row['Day of Week'], refs, date_fields[idx])
+            refs = tuple(r.strip() for r in bible_refs.split(",") if r.strip())
+            out.append(heading.encode('utf-8') + latex_day_body(len(refs), []).encode('utf-8'))
+        return out
+
+    def columnar():
+        table = schedule_table(df)
+        items = table.tracks['Bible'].items
+        rows = prepare_latex_rows(table)
+        headings = [latex_day_heading(row.date, row.day_of_week, day_ref_bounds(items, row.start, row.stop),
+                                      row.date_fields).encode('utf-8') for row in rows]
+        return [heading + latex_day_body(row.stop - row.start, []).encode('utf-8')
+                for heading, row in zip(headings, rows)]
+
+    if legacy() != columnar():
+        raise AssertionError("Row rendering differs between the iterrows and columnar paths")
+    results = {}
+    for name, render in (("iterrows", legacy), ("columnar", columnar)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        results[name] = (time.perf_counter() - t0) / repeat / max(len(df), 1)
+    print(f"{len(df)} rows: iterrows {results['iterrows'] * 1e6:.1f} us/row, "
+          f"columnar {results['columnar'] * 1e6:.1f} us/row ({results['iterrows'] / results['columnar']:.1f}x)")
+    return results
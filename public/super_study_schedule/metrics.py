@@ -0,0 +1,132 @@
+import io
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Run Metrics
+# --------------------------------
+# Per-stage timers and counters for one run, reported as JSON at the end:
+#   csv_load, verse_flattening, distribution, ics_export, date_conversion,
+#   http_fetch, http_backoff, text_cleaning, latex_formatting, checkpoint_io
+# Stage seconds are summed over every call, including calls on fetch worker
+# threads, so concurrent stages can add up to more than the wall time.
+# Recording costs two perf_counter calls and a lock per call; stages are
+# placed around whole rows, payloads or files, never single verses.
+class RunMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.perf_counter()
+            self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            self.stages = {}
+            self.counters = {}
+            self.memory = None
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = [0, 0.0]
+            totals[0] += calls
+            totals[1] += seconds
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def report(self, extra=None):
+        with self.lock:
+            report = {
+                'started_at': self.started_at,
+                'wall_seconds': round(time.perf_counter() - self.started, 3),
+                'stages': {name: {'calls': calls, 'seconds': round(seconds, 4)}
+                           for name, (calls, seconds) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])},
+                'counters': dict(sorted(self.counters.items())),
+            }
+            if self.memory is not None:
+                report['memory'] = self.memory
+        if extra:
+            report.update(extra)
+        return report
+
+    def log_summary(self):
+        report = self.report()
+        stages = ", ".join(f"{name} {totals['seconds']:.2f}s/{totals['calls']}"
+                           for name, totals in report['stages'].items())
+        logger.info(f"Run metrics ({report['wall_seconds']:.2f}s wall): {stages or 'no stages recorded'}")
+
+METRICS = RunMetrics()
+stage = METRICS.stage
+count = METRICS.count
+
+def timed(name):
+    # Decorator recording every call of a function under stage `name`.
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                METRICS.add_time(name, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+def write_metrics_report(path, extra=None):
+    with open(path, 'w') as f:
+        json.dump(METRICS.report(extra), f, indent=2)
+    logger.info(f"Metrics report saved to: {path}")
+    return path
+
+@contextmanager
+def profile_run(profile_path=None, trace_memory=False, top=20):
+    # Optionally runs the block under cProfile (stats dumped to profile_path,
+    # top functions by cumulative time logged) and tracemalloc (peak and top
+    # allocation sites added to the metrics report).
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+            logger.info(f"Profile saved to {profile_path}\n{out.getvalue()}")
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            top_stats = tracemalloc.take_snapshot().statistics('lineno')[:top]
+            tracemalloc.stop()
+            METRICS.memory = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_allocations': [{'site': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                                    for stat in top_stats],
+            }
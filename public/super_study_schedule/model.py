@@ -0,0 +1,186 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from .distribution import WEEKDAY_NAMES
+from .sefaria import parse_verse_ref
+from .tracking import VerseRefs
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Schedule Table
+# --------------------------------
+# The schedule as struct-of-arrays, shared by the scheduler, the ICS exporter
+# and the LaTeX renderer. Dates are one datetime64[D] array. Each track keeps
+# its items once (VerseRefs: integer book/chapter/verse arrays with interned
+# book names, or a plain list for free-form tracks) plus an int64 array of
+# day offsets, so day i reads items[offsets[i]:offsets[i + 1]]. Nothing is
+# stored per day: reference strings are formatted only when a consumer needs
+# text (the CSV, an ICS description, a LaTeX heading or a Sefaria request),
+# and the joined "Bible" strings are never split back into references.
+# Tables read from a CSV keep the original date/weekday labels only where
+# they differ from the computed ones (e.g. old M/D/YYYY exports).
+TrackColumn = namedtuple('TrackColumn', ['items', 'offsets'])
+
+class ScheduleTable:
+    __slots__ = ('dates', 'tracks', 'date_labels', 'weekday_labels', 'first_index')
+
+    def __init__(self, dates, tracks, date_labels=None, weekday_labels=None, first_index=0):
+        self.dates = dates
+        self.tracks = tracks
+        self.date_labels = date_labels
+        self.weekday_labels = weekday_labels
+        self.first_index = first_index
+
+    def __len__(self):
+        return len(self.dates)
+
+    def date_strings(self):
+        if self.date_labels is not None:
+            return list(self.date_labels)
+        return np.datetime_as_string(self.dates, unit='D').tolist()
+
+    def weekday_names(self):
+        if self.weekday_labels is not None:
+            return list(self.weekday_labels)
+        # 1970-01-01, day 0 of datetime64[D], was a Thursday.
+        return [WEEKDAY_NAMES[d] for d in ((self.dates.astype(np.int64) + 3) % 7).tolist()]
+
+    def day_counts(self, name):
+        return np.diff(self.tracks[name].offsets)
+
+    def day_texts(self, name):
+        items, offsets = self.tracks[name]
+        base = int(offsets[0])
+        refs = items[base:int(offsets[-1])]
+        bounds = (offsets - base).tolist()
+        return [", ".join(refs[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def slice_days(self, start, stop):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return ScheduleTable(
+            self.dates[start:stop],
+            {name: TrackColumn(items, offsets[start:stop + 1]) for name, (items, offsets) in self.tracks.items()},
+            None if self.date_labels is None else self.date_labels[start:stop],
+            None if self.weekday_labels is None else self.weekday_labels[start:stop],
+            self.first_index + start,
+        )
+
+    def to_frame(self):
+        # The schedule CSV's columns: Date, Day of Week, then <track> and <track> Count.
+        import pandas as pd
+        columns = {"Date": self.date_strings(), "Day of Week": self.weekday_names()}
+        for name in self.tracks:
+            columns[name] = self.day_texts(name)
+            columns[f"{name} Count"] = self.day_counts(name).astype(np.int64)
+        return pd.DataFrame(columns, index=pd.RangeIndex(self.first_index, self.first_index + len(self)))
+
+    @classmethod
+    def from_frame(cls, df, track_names=None):
+        # Parses a schedule DataFrame (e.g. a CSV read back) once. Track columns
+        # default to every column with a matching "<name> Count" column, plus
+        # "Bible". A track whose references all parse becomes VerseRefs;
+        # otherwise its items stay strings.
+        import pandas as pd
+        from .hebcal import parse_schedule_dates
+        if track_names is None:
+            track_names = [c for c in df.columns if f"{c} Count" in df.columns]
+            if 'Bible' in df.columns and 'Bible' not in track_names:
+                track_names.append('Bible')
+        labels = df['Date'].tolist()
+        dates = parse_schedule_dates(labels).to_numpy(dtype='datetime64[D]')
+        table = cls(dates, {name: parse_track_column(df[name].tolist()) for name in track_names})
+        if table.date_strings() != [str(label) for label in labels]:
+            table.date_labels = labels
+        weekdays = df['Day of Week'].tolist() if 'Day of Week' in df.columns else [""] * len(df)
+        if table.weekday_names() != weekdays:
+            table.weekday_labels = weekdays
+        if not isinstance(df.index, pd.RangeIndex) or df.index.step != 1:
+            logger.debug("Schedule index is not a plain range; row numbers restart at 0")
+        elif len(df):
+            table.first_index = int(df.index[0])
+        return table
+
+def parse_track_column(texts):
+    items = []
+    offsets = [0]
+    for text in texts:
+        if isinstance(text, str):
+            items.extend(filter(None, map(str.strip, text.split(","))))
+        offsets.append(len(items))
+    offsets = np.asarray(offsets, dtype=np.int64)
+    parsed = [parse_verse_ref(item) for item in items]
+    if not all(parsed):
+        return TrackColumn(items, offsets)
+    book_ids = {}
+    books = np.fromiter((book_ids.setdefault(book, len(book_ids)) for book, _, _ in parsed),
+                        dtype=np.uint16, count=len(parsed))
+    chapters = np.fromiter((chapter for _, chapter, _ in parsed), dtype=np.uint16, count=len(parsed))
+    verses = np.fromiter((verse for _, _, verse in parsed), dtype=np.uint16, count=len(parsed))
+    return TrackColumn(VerseRefs(tuple(book_ids), books, chapters, verses), offsets)
+
+def day_ref_bounds(items, start, stop):
+    # The first and last reference of a day, all a heading needs.
+    if stop - start > 1:
+        return items[start], items[stop - 1]
+    return (items[start],) if stop > start else ()
+
+def benchmark_schedule_model(tracking_csv_path=None, years=30, child_name="Bench"):
+    # Peak traced memory and blocks still allocated per day for a long
+    # schedule consumed by the ICS writer and the LaTeX row preparation: the
+    # DataFrame of joined reference strings, re-split per day for LaTeX (the
+    # previous path), versus the ScheduleTable shared by both.
+    import gc
+    import os
+    import sys
+    import time
+    import tracemalloc
+    from datetime import datetime, timedelta
+    from .hebcal import hebrew_date_fields
+    from .ics import write_ics
+    from .latex import prepare_latex_rows
+    from .schedule import build_schedule_table, default_tracks, load_tracking_sheet
+
+    tracks = default_tracks(load_tracking_sheet(tracking_csv_path))
+    start_date = datetime(2020, 1, 1)
+    end_date = datetime(start_date.year + years, 1, 1) - timedelta(days=1)
+    hebrew_date_fields(["2020-01-01"])  # build the calendar index outside the measurement
+
+    def legacy():
+        df = build_schedule_table(tracks, start_date, end_date).to_frame()
+        with open(os.devnull, 'w', encoding='utf-8', newline='') as f:
+            write_ics(df, f, child_name)
+        texts = df['Bible'].fillna("").tolist()
+        rows = list(zip(df['Date'].tolist(), df['Day of Week'].tolist(),
+                        [tuple(filter(None, map(str.strip, text.split(",")))) for text in texts], texts,
+                        hebrew_date_fields(df['Date'])))
+        return df, rows
+
+    def compact():
+        table = build_schedule_table(tracks, start_date, end_date)
+        with open(os.devnull, 'w', encoding='utf-8', newline='') as f:
+            write_ics(table, f, child_name)
+        return table, prepare_latex_rows(table)
+
+    results = {}
+    for name, build in (("legacy", legacy), ("table", compact)):
+        gc.collect()
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        kept = build()
+        seconds = time.perf_counter() - t0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.collect()
+        days = len(kept[1])
+        results[name] = {'days': days, 'seconds': seconds, 'peak_bytes': peak, 'retained_bytes': current,
+                         'blocks_per_day': (sys.getallocatedblocks() - blocks_before) / max(days, 1)}
+        del kept
+    for name, r in results.items():
+        print(f"{name:<7} {r['days']} days: peak {r['peak_bytes'] / 2**20:.1f} MiB, "
+              f"retained {r['retained_bytes'] / 2**20:.1f} MiB, {r['blocks_per_day']:.1f} blocks/day, "
+              f"{r['seconds']:.2f}s")
+    return results
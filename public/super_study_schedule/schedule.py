@@ -0,0 +1,173 @@
+import io
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import study_paths
+from .distribution import Track, distribute_items_balanced, track_day_weights, weighted_day_offsets
+from .hebcal import hebrew_birthday_window
+from .ics import export_ics
+from .metrics import stage, timed
+from .model import ScheduleTable, TrackColumn
+from .tracking import TrackingSheet, load_tracking_columns
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Schedule Table Construction
+# --------------------------------
+# Verse references are built column-wise: chapter prefixes are repeated once
+# per verse with np.repeat and verse numbers come from one arange, so no
+# Python code runs per verse. Days are one datetime64 range; each track gets
+# an array of day offsets into its items (see model.ScheduleTable).
+@timed('verse_flattening')
+def build_verse_refs(bible_df):
+    counts = bible_df['Number of Verses or Mishnahs'].to_numpy(dtype=np.int64)
+    chapter_starts = np.cumsum(counts) - counts
+    verse_numbers = np.arange(counts.sum(), dtype=np.int64) - np.repeat(chapter_starts, counts) + 1
+    prefixes = (bible_df['Book'].astype(str) + ' ' + bible_df['Chapter'].astype(str) + ':').to_numpy()
+    refs = pd.Series(np.repeat(prefixes, counts), dtype=object) + pd.Series(verse_numbers).astype(str)
+    return refs.tolist()
+
+def build_schedule_frame(bible_df, start_date, end_date):
+    return build_multitrack_schedule_frame([Track('Bible', build_verse_refs(bible_df))], start_date, end_date)
+
+def build_track_items(data_df, data_type):
+    # data_df is a TrackingSheet (items stay integer arrays until a day's text
+    # is joined) or a DataFrame with the tracking sheet's columns.
+    if isinstance(data_df, TrackingSheet):
+        return data_df.verse_refs(data_type)
+    return build_verse_refs(data_df[data_df['Data Type'] == data_type])
+
+def build_schedule_table(tracks, start_date, end_date):
+    # The schedule as a ScheduleTable: each track keeps its items and gets day
+    # offsets; days outside a track's window get no items. No per-day text is
+    # built here (see ScheduleTable.to_frame for the CSV columns).
+    names = [track.name for track in tracks]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Track names must be unique: {names}")
+    total_days = max((end_date - start_date).days + 1, 0)
+    dates = np.datetime64(start_date, 'D') + np.arange(total_days)
+    columns = {}
+    for track in tracks:
+        first = max(0, (track.start_date - start_date).days) if track.start_date is not None else 0
+        last = min(total_days, (track.end_date - start_date).days + 1) if track.end_date is not None else total_days
+        offsets = np.zeros(total_days + 1, dtype=np.int64)
+        if last > first:
+            with stage('distribution'):
+                day_offsets = weighted_day_offsets(len(track.items),
+                                                   track_day_weights(track, pd.DatetimeIndex(dates[first:last])))
+                offsets[first:last + 1] = day_offsets
+                offsets[last + 1:] = day_offsets[-1]
+        elif len(track.items):
+            logger.warning(f"Track '{track.name}' window lies outside the schedule; its items are not scheduled")
+        columns[track.name] = TrackColumn(track.items, offsets)
+    return ScheduleTable(dates, columns)
+
+def build_multitrack_schedule_frame(tracks, start_date, end_date):
+    return build_schedule_table(tracks, start_date, end_date).to_frame()
+
+def build_schedule_frame_legacy(bible_df, start_date, end_date):
+    # Original row-by-row construction, kept as the reference for benchmarks.
+    def build_bible_verse_list(row):
+        return [f"{row['Book']} {row['Chapter']}:{verse}"
+                for verse in range(1, row['Number of Verses or Mishnahs'] + 1)]
+    bible_rows = bible_df.apply(build_bible_verse_list, axis=1).tolist()
+    bible_verses = [verse for row_list in bible_rows for verse in row_list]
+    distributed_bible = distribute_items_balanced(bible_verses, start_date, end_date)
+    total_days = (end_date - start_date).days + 1
+    schedule_records = []
+    for offset in range(total_days):
+        day_date = start_date + timedelta(days=offset)
+        day_of_week = day_date.strftime("%A")
+        day_range = distributed_bible[offset]
+        bible_for_day = ", ".join(bible_verses[day_range.start:day_range.stop])
+        schedule_records.append({
+            "Date": day_date.strftime("%Y-%m-%d"),
+            "Day of Week": day_of_week,
+            "Bible": bible_for_day,
+            "Bible Count": len(day_range)
+        })
+    return pd.DataFrame(schedule_records)
+
+def benchmark_schedule_construction(tracking_csv_path, years=(5, 20, 100)):
+    data_df = pd.read_csv(tracking_csv_path)
+    bible_df = data_df[data_df['Data Type'] == 'Bible']
+    start_date = datetime(2020, 1, 1)
+    results = []
+    for span in years:
+        end_date = datetime(start_date.year + span, 1, 1) - timedelta(days=1)
+        timings = {}
+        csv_text = {}
+        for name, build in (("columnar", build_schedule_frame), ("legacy", build_schedule_frame_legacy)):
+            t0 = time.perf_counter()
+            frame = build(bible_df, start_date, end_date)
+            timings[name] = time.perf_counter() - t0
+            buffer = io.StringIO()
+            frame.to_csv(buffer, index=False)
+            csv_text[name] = buffer.getvalue()
+        if csv_text["columnar"] != csv_text["legacy"]:
+            raise AssertionError(f"Columnar schedule CSV differs from legacy for a {span}-year span")
+        results.append({"years": span, **timings})
+        print(f"{span:>4} years: columnar {timings['columnar']:.4f}s, legacy {timings['legacy']:.4f}s "
+              f"({timings['legacy'] / timings['columnar']:.1f}x)")
+    return results
+
+# --------------------------------
+# Schedule API
+# --------------------------------
+# Non-interactive entry points shared by the notebook, the CLI and batch mode.
+# Dates may be datetime/date objects or YYYY-MM-DD strings.
+def parse_iso_date(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    value = str(value).strip()
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+def load_tracking_sheet(tracking_csv_path=None):
+    # A TrackingSheet from the columnar cache; call .to_frame() for a DataFrame.
+    return load_tracking_columns(tracking_csv_path or study_paths().tracking_csv)
+
+def default_tracks(data_df, include_mishnah=False):
+    tracks = [Track('Bible', build_track_items(data_df, 'Bible'))]
+    if include_mishnah:
+        tracks.append(Track('Mishnah', build_track_items(data_df, 'Mishnah')))
+    return tracks
+
+def build_schedule(birth_date, start=None, end=None, tracks=None, tracking_csv_path=None, include_mishnah=False,
+                   as_table=False):
+    # Runs from the 5th Hebrew birthday (or `start`) to the 10th (or `end`).
+    # Without `tracks`, the Bible (and optionally Mishnah) tracks are read from
+    # the tracking sheet. Returns a DataFrame, or with as_table=True the
+    # ScheduleTable it is built from.
+    fifth_birthday, tenth_birthday = hebrew_birthday_window(parse_iso_date(birth_date))
+    if tracks is None:
+        tracks = default_tracks(load_tracking_sheet(tracking_csv_path), include_mishnah)
+    table = build_schedule_table(tracks, parse_iso_date(start) or fifth_birthday,
+                                 parse_iso_date(end) or tenth_birthday)
+    return table if as_table else table.to_frame()
+
+def schedule_file_stem(child_name, birth_date_str):
+    return f"study_schedule_{child_name.replace(' ', '_')}_{birth_date_str}"
+
+def write_schedule_files(schedule, output_dir, child_name, birth_date_str, ics_mode="events", ics_chunk_days=None,
+                         incremental=False):
+    # Writes <stem>.csv and, unless ics_mode is None, <stem>.ics from a
+    # ScheduleTable or DataFrame; returns (csv_path, ics_paths).
+    stem = os.path.join(output_dir, schedule_file_stem(child_name, birth_date_str))
+    schedule_df = schedule.to_frame() if isinstance(schedule, ScheduleTable) else schedule
+    schedule_df.to_csv(f"{stem}.csv", index=False)
+    del schedule_df
+    ics_paths = []
+    if ics_mode:
+        ics_paths = export_ics(schedule, f"{stem}.ics", child_name, mode=ics_mode, chunk_days=ics_chunk_days,
+                               incremental=incremental)
+    return f"{stem}.csv", ics_paths
@@ -0,0 +1,506 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .config import study_paths
+from .metrics import count, stage, timed
+from .text import (clean_verse_texts, escape_latex_batch, escape_latex_special_chars,
+                   escape_latex_special_chars_legacy, remove_html_tags_and_entities,
+                   remove_html_tags_and_entities_legacy)
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Sefaria Text Cache
+# --------------------------------
+SEFARIA_API_URL = 'https://www.sefaria.org/api/texts/'
+def normalize_sefaria_ref(ref):
+    return ' '.join(ref.split())
+
+class SefariaTextCache:
+    # Fetched responses are stored under the SHA-256 of their normalized
+    # reference, so "Genesis  1:1" and "Genesis 1:1" share one entry. path
+    # defaults to the data directory's sefaria_cache.sqlite at call time.
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None, offline=False):
+        path = path or study_paths().sefaria_cache
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        # One connection shared by the fetch threads, serialized by a lock.
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "key TEXT PRIMARY KEY, ref TEXT NOT NULL, payload TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS texts_accessed ON texts (accessed_at)")
+        self.conn.commit()
+
+    @staticmethod
+    def key_for(ref):
+        return hashlib.sha256(normalize_sefaria_ref(ref).encode('utf-8')).hexdigest()
+
+    def get(self, ref):
+        key = self.key_for(ref)
+        with self.lock:
+            row = self.conn.execute("SELECT payload, fetched_at FROM texts WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds and not self.offline):
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE texts SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, ref, payload):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO texts (key, ref, payload, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.key_for(ref), normalize_sefaria_ref(ref), json.dumps(payload, ensure_ascii=False), now, now)
+            )
+            self.conn.commit()
+
+    def evict(self):
+        removed = 0
+        with self.lock:
+            if self.ttl_seconds is not None:
+                removed += self.conn.execute(
+                    "DELETE FROM texts WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+            if self.max_entries is not None:
+                removed += self.conn.execute(
+                    "DELETE FROM texts WHERE key NOT IN "
+                    "(SELECT key FROM texts ORDER BY accessed_at DESC LIMIT ?)", (self.max_entries,)
+                ).rowcount
+            self.conn.commit()
+        if removed:
+            logger.info(f"Evicted {removed} cached Sefaria entries from {self.path}")
+        return removed
+
+    def __contains__(self, ref):
+        with self.lock:
+            row = self.conn.execute("SELECT fetched_at FROM texts WHERE key = ?", (self.key_for(ref),)).fetchone()
+        if row is None:
+            return False
+        return self.ttl_seconds is None or self.offline or time.time() - row[0] <= self.ttl_seconds
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --------------------------------
+# Sefaria HTTP Client
+# --------------------------------
+class HostRateLimiter:
+    # Hands out evenly spaced request slots per host across all threads.
+    def __init__(self, requests_per_second=None):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class FetchStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.latencies = []
+        self.failures = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            if not ok:
+                self.failures += 1
+
+    def record_retry(self, sleep_seconds):
+        with self.lock:
+            self.retries += 1
+            self.backoff_seconds += sleep_seconds
+
+    def summary(self):
+        with self.lock:
+            latencies = np.array(self.latencies, dtype=float)
+            elapsed = time.perf_counter() - self.started
+            summary = {
+                'requests': len(latencies),
+                'failures': self.failures,
+                'retries': self.retries,
+                'backoff_seconds': round(self.backoff_seconds, 3),
+                'elapsed_seconds': round(elapsed, 3),
+                'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            }
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary.update({'p50_ms': round(p50 * 1000, 1), 'p95_ms': round(p95 * 1000, 1),
+                            'p99_ms': round(p99 * 1000, 1), 'max_ms': round(latencies.max() * 1000, 1)})
+        return summary
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(
+            f"Sefaria fetch: {summary['requests']} requests in {summary['elapsed_seconds']}s "
+            f"({summary['requests_per_second']} req/s), {summary['retries']} retries, {summary['failures']} failed, "
+            f"p50 {summary.get('p50_ms', 0)}ms, p95 {summary.get('p95_ms', 0)}ms, p99 {summary.get('p99_ms', 0)}ms"
+        )
+        return summary
+
+class SefariaHttpClient:
+    # Shared keep-alive session, per-host rate limiting and request stats for
+    # concurrent fetching. Identical references requested at the same time
+    # (neighbouring days reading the same chapter) are fetched only once.
+    def __init__(self, max_workers=8, requests_per_second=5.0):
+        import requests
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.stats = FetchStats()
+        self.lock = threading.Lock()
+        self.inflight = {}
+
+    def get(self, url, timeout):
+        self.rate_limiter.wait(urlsplit(url).netloc)
+        t0 = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=timeout)
+        except Exception:
+            self.stats.record(time.perf_counter() - t0, False)
+            raise
+        self.stats.record(time.perf_counter() - t0, response.status_code == 200)
+        return response
+
+    def single_flight(self, key, fn):
+        with self.lock:
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+        return future.result()
+
+    def close(self):
+        self.session.close()
+
+# Upper bound for any single retry sleep, including a server's Retry-After:
+# a fetch thread sleeping longer would stall the in-order fetch_ahead window.
+BACKOFF_CAP_SECONDS = 16.0
+
+def backoff_delay(attempt, base=1.0, cap=BACKOFF_CAP_SECONDS):
+    # Exponential backoff with "equal jitter": half the delay is fixed, half random.
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def fetch_ahead(items, fetch, max_workers=8, lookahead=None):
+    # Runs `fetch` on up to `lookahead` items ahead of the consumer, yielding
+    # (item, result) pairs in input order.
+    lookahead = lookahead or max_workers * 4
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    window = deque()
+    try:
+        for item in items:
+            window.append((item, executor.submit(fetch, item)))
+            if len(window) >= lookahead:
+                item, future = window.popleft()
+                yield item, future.result()
+        while window:
+            item, future = window.popleft()
+            yield item, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+# --------------------------------
+# Sefaria Fetching
+# --------------------------------
+def fetch_sefaria_text(single_ref, max_retries=5, timeout=10, cache=None, api_url=SEFARIA_API_URL, client=None):
+    if client is not None:
+        return client.single_flight(
+            normalize_sefaria_ref(single_ref),
+            lambda: _fetch_sefaria_text(single_ref, max_retries, timeout, cache, api_url, client)
+        )
+    return _fetch_sefaria_text(single_ref, max_retries, timeout, cache, api_url, None)
+
+def _fetch_sefaria_text(single_ref, max_retries, timeout, cache, api_url, client):
+    if cache is not None:
+        data = cache.get(single_ref)
+        if data is not None:
+            count('cache_hits')
+            return data
+        count('cache_misses')
+        if cache.offline:
+            logger.error(f"'{single_ref}' is not cached and offline mode is enabled.")
+            return None
+    logger.debug(f"Fetching Sefaria text for reference: '{single_ref}'")
+    url = f'{api_url}{single_ref}?context=0'
+    if client is not None:
+        get = client.get
+    else:
+        import requests
+        get = requests.get
+    response = None
+    for attempt in range(1, max_retries + 1):
+        retry_after = 0
+        try:
+            count('http_requests')
+            with stage('http_fetch'):
+                response = get(url, timeout=timeout)
+            if response.status_code == 200:
+                break
+            else:
+                logger.warning(f"HTTP {response.status_code} for '{single_ref}' (attempt {attempt}/{max_retries})")
+                if response.status_code == 429 and response.headers.get('Retry-After', '').isdigit():
+                    retry_after = min(int(response.headers['Retry-After']), BACKOFF_CAP_SECONDS)
+        except Exception as e:
+            logger.warning(f"Request error for '{single_ref}' (attempt {attempt}/{max_retries}): {e}")
+        response = None
+        count('http_errors')
+        if attempt < max_retries:
+            delay = max(backoff_delay(attempt), retry_after)
+            if client is not None:
+                client.stats.record_retry(delay)
+            count('http_retries')
+            with stage('http_backoff'):
+                time.sleep(delay)
+    if response is None:
+        logger.error(f"Failed to retrieve '{single_ref}' after {max_retries} attempts.")
+        return None
+    try:
+        data = response.json()
+    except Exception as e:
+        logger.error(f"Error processing data for '{single_ref}': {e}")
+        return None
+    # Only the fields the parser reads are kept, which keeps the cache small.
+    data = {'he': data.get('he', []), 'sections': data.get('sections', [])}
+    if cache is not None:
+        cache.put(single_ref, data)
+    return data
+
+@timed('text_cleaning')
+def parse_sefaria_payload(single_ref, data):
+    verse_entries = []
+    try:
+        he_data = data.get('he', [])
+        sections = data.get('sections', [])
+        start_chapter = sections[0] if len(sections) > 0 else 1
+        start_verse = sections[1] if len(sections) > 1 else 1
+        if isinstance(he_data, str):
+            verse_text_clean = remove_html_tags_and_entities(he_data)
+            verse_entries.append((start_chapter, start_verse, verse_text_clean))
+        elif isinstance(he_data, list) and he_data:
+            if isinstance(he_data[0], list):
+                for chapter_index, chapter_verses in enumerate(he_data):
+                    current_chapter = start_chapter + chapter_index
+                    if not isinstance(chapter_verses, list):
+                        continue
+                    for verse_index, verse_text_clean in enumerate(clean_verse_texts(chapter_verses), start=1):
+                        verse_entries.append((current_chapter, verse_index, verse_text_clean))
+            else:
+                for verse_index, verse_text_clean in enumerate(clean_verse_texts(he_data), start=start_verse):
+                    verse_entries.append((start_chapter, verse_index, verse_text_clean))
+        else:
+            logger.warning(f"Unexpected format for '{single_ref}': {he_data}")
+    except Exception as e:
+        logger.error(f"Error processing data for '{single_ref}': {e}")
+    return verse_entries
+
+# --------------------------------
+# Sefaria Request Planning
+# --------------------------------
+# Contiguous verses of one chapter are merged into a single ranged request
+# ("Genesis 1:1-13"), or a whole-chapter request ("Genesis 1") when the run
+# covers the chapter or chapter_granular is set. Whole-chapter payloads are
+# shared across days through the cache, so a full Tanach build needs about one
+# request per chapter instead of one per verse.
+VERSE_REF_PATTERN = re.compile(r'^(.+) (\d+):(\d+)$')
+
+SefariaRequest = namedtuple('SefariaRequest', ['ref', 'book', 'chapter', 'verses', 'source_refs'])
+
+def parse_verse_ref(single_ref):
+    match = VERSE_REF_PATTERN.match(single_ref.strip())
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2)), int(match.group(3))
+
+def ref_book_name(single_ref):
+    # Book part of a reference that VERSE_REF_PATTERN could not parse, e.g. "Genesis 1:1-5".
+    parts = single_ref.strip().split(' ')
+    return ' '.join(parts[:-1]) if len(parts) > 1 else single_ref.strip()
+
+def plan_sefaria_requests(refs, chapter_lengths=None, chapter_granular=False):
+    plan = []
+    run = None
+    for single_ref in refs:
+        parsed = parse_verse_ref(single_ref)
+        if parsed is None:
+            plan.append(SefariaRequest(single_ref, None, None, None, [single_ref]))
+            run = None
+            continue
+        book, chapter, verse = parsed
+        if run is not None and run.book == book and run.chapter == chapter and run.verses[-1] + 1 == verse:
+            run.verses.append(verse)
+            run.source_refs.append(single_ref)
+            continue
+        run = SefariaRequest(None, book, chapter, [verse], [single_ref])
+        plan.append(run)
+    return [_finalize_sefaria_request(r, chapter_lengths, chapter_granular) if r.book is not None else r
+            for r in plan]
+
+def _finalize_sefaria_request(run, chapter_lengths, chapter_granular):
+    first, last = run.verses[0], run.verses[-1]
+    whole_chapter = (chapter_lengths is not None and first == 1
+                     and chapter_lengths.get((run.book, run.chapter)) == last)
+    if chapter_granular or whole_chapter:
+        ref = f"{run.book} {run.chapter}"
+    elif first == last:
+        ref = f"{run.book} {run.chapter}:{first}"
+    else:
+        ref = f"{run.book} {run.chapter}:{first}-{last}"
+    return run._replace(ref=ref)
+
+def get_sefaria_verse_entries(ref, max_retries=5, timeout=10, cache=None, api_url=SEFARIA_API_URL,
+                              coalesce=True, chapter_lengths=None, chapter_granular=False, client=None,
+                              with_book=False):
+    # Returns (chapter, verse, text) entries, or (book, chapter, verse, text)
+    # with with_book=True so callers can detect book changes within a day.
+    # ref is a comma-separated string or an already split sequence of references.
+    refs = [r.strip() for r in ref.split(',') if r.strip()] if isinstance(ref, str) else list(ref)
+    if coalesce:
+        plan = plan_sefaria_requests(refs, chapter_lengths=chapter_lengths, chapter_granular=chapter_granular)
+    else:
+        plan = [SefariaRequest(r, None, None, None, [r]) for r in refs]
+    verse_entries = []
+    for request in plan:
+        data = fetch_sefaria_text(request.ref, max_retries=max_retries, timeout=timeout, cache=cache,
+                                  api_url=api_url, client=client)
+        if request.book is None:
+            if data is not None:
+                entries = parse_sefaria_payload(request.ref, data)
+                if with_book:
+                    book = ref_book_name(request.ref)
+                    entries = [(book, c, v, text) for c, v, text in entries]
+                verse_entries.extend(entries)
+            continue
+        if data is None:
+            if len(request.source_refs) > 1 or request.source_refs[0] != request.ref:
+                logger.warning(f"Falling back to per-verse requests for '{request.ref}'")
+                verse_entries.extend(get_sefaria_verse_entries(
+                    ','.join(request.source_refs), max_retries=max_retries, timeout=timeout,
+                    cache=cache, api_url=api_url, coalesce=False, client=client, with_book=with_book))
+            continue
+        by_verse = {(c, v): (c, v, text) for c, v, text in parse_sefaria_payload(request.ref, data)}
+        for verse, single_ref in zip(request.verses, request.source_refs):
+            entry = by_verse.get((request.chapter, verse))
+            if entry is None:
+                logger.error(f"'{single_ref}' missing from response for '{request.ref}'.")
+                continue
+            verse_entries.append((request.book,) + entry if with_book else entry)
+    return verse_entries
+
+def prefetch_schedule_texts(schedule, cache, max_retries=5, timeout=10, api_url=SEFARIA_API_URL,
+                            chapter_granular=True, client=None, max_workers=8):
+    # Warm the cache for every reference in a schedule (DataFrame or CSV path)
+    # so that render_latex can later run with offline=True.
+    from tqdm import tqdm
+    df = schedule if isinstance(schedule, pd.DataFrame) else pd.read_csv(schedule, usecols=['Bible'])
+    requests_needed = []
+    seen = set()
+    for bible_refs in df['Bible'].dropna():
+        refs = [r.strip() for r in bible_refs.split(',') if r.strip()]
+        for request in plan_sefaria_requests(refs, chapter_granular=chapter_granular):
+            request_ref = normalize_sefaria_ref(request.ref)
+            if request_ref not in seen:
+                seen.add(request_ref)
+                requests_needed.append(request_ref)
+    missing = [r for r in requests_needed if r not in cache]
+    logger.info(f"Prefetching {len(missing)} of {len(requests_needed)} requests into {cache.path}")
+    def fetch(request_ref):
+        return fetch_sefaria_text(request_ref, max_retries=max_retries, timeout=timeout, cache=cache,
+                                  api_url=api_url, client=client)
+    failed = 0
+    fetched = fetch_ahead(missing, fetch, max_workers=max_workers)
+    for request_ref, data in tqdm(fetched, total=len(missing), desc="Prefetching", ncols=100):
+        if data is None:
+            failed += 1
+    return {'requests': len(requests_needed), 'fetched': len(missing) - failed, 'failed': failed}
+
+def benchmark_text_cleaning(cache_path=None, texts=None, repeat=3):
+    # Runs over every verse stored in the Sefaria cache (prefetch the full
+    # Tanach first) unless `texts` is given.
+    if texts is None:
+        texts = []
+        with SefariaTextCache(cache_path) as cache:
+            for (payload,) in cache.conn.execute("SELECT payload FROM texts"):
+                he_data = json.loads(payload).get('he', [])
+                if isinstance(he_data, str):
+                    texts.append(he_data)
+                else:
+                    for item in he_data:
+                        texts.extend(item if isinstance(item, list) else [item])
+    texts = [t for t in texts if isinstance(t, str)]
+    legacy = [escape_latex_special_chars_legacy(remove_html_tags_and_entities_legacy(t)) for t in texts]
+    if escape_latex_batch(clean_verse_texts(texts)) != legacy:
+        raise AssertionError("Compiled text cleaning output differs from the legacy functions")
+    timings = {}
+    for name, run in (
+        ("legacy", lambda: [escape_latex_special_chars_legacy(remove_html_tags_and_entities_legacy(t)) for t in texts]),
+        ("per-verse", lambda: [escape_latex_special_chars(remove_html_tags_and_entities(t)) for t in texts]),
+        ("batch", lambda: escape_latex_batch(clean_verse_texts(texts))),
+    ):
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    print(f"{len(texts)} verses: " + ", ".join(f"{name} {secs:.4f}s" for name, secs in timings.items()))
+    return timings
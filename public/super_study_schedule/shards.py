@@ -0,0 +1,212 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from .hebcal import hebrew_date_fields
+from .latex import HEBREW_GREGORIAN_MONTHS, LATEX_PREAMBLE, has_refs
+from .text import parse_ref
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Sharded LaTeX Output
+# --------------------------------
+# A rendered .tex file is split into one body file per month or per book
+# (bodies/NNN-<key>.tex) and two ways of compiling them:
+#   master.tex      the original preamble and TOC with every body \input in
+#                   order; compiles in one process to the same book as before.
+#   NNN-<key>.tex   one standalone volume per shard, compiled in parallel.
+# Volumes leave out the TOC page but keep writing their own .toc file. A first
+# parallel pass counts each volume's pages; a second pass starts every volume
+# at the page after the previous one ends, so the page numbers in the .toc
+# files run on across volumes. Those files are then merged (with one entry
+# per volume) into contents.tex, and the PDFs are joined into book.pdf when
+# pdfunite or qpdf is available.
+SHARD_BY = ('month', 'book')
+LATEX_SETUP = LATEX_PREAMBLE[:LATEX_PREAMBLE.index("\\begin{document}")]
+
+# \addcontentsline entries reach the .toc file only while \tf@toc is open;
+# \tableofcontents opens it too, but also typesets the contents.
+SHARD_TOC_OUTPUT = "\\makeatletter\n\\newwrite\\tf@toc\n\\immediate\\openout\\tf@toc\\jobname.toc\\relax\n\\makeatother\n"
+PDF_PAGES_PATTERN = re.compile(r"Output written on .*?\((\d+) pages?", re.DOTALL)
+
+Shard = namedtuple('Shard', ['name', 'label', 'first_row', 'rows', 'tex_path', 'body_path'])
+ShardBuild = namedtuple('ShardBuild', ['name', 'pages', 'first_page', 'seconds'])
+
+def shard_keys(schedule_df, by="month"):
+    # (key, label) per row. Keys name the files; labels are the volume titles
+    # in the merged TOC. Rows without a date or references join the previous
+    # row's shard.
+    if by not in SHARD_BY:
+        raise ValueError(f"Unknown shard mode {by!r}; expected one of {SHARD_BY}")
+    keys = []
+    previous = ("start", "")
+    if by == "month":
+        for fields in hebrew_date_fields(schedule_df['Date']):
+            if fields is not None:
+                year, month = fields[0], fields[1]
+                previous = (f"{year:04d}-{month:02d}", f"{HEBREW_GREGORIAN_MONTHS[month]} {year}")
+            keys.append(previous)
+    else:
+        for refs in schedule_df['Bible']:
+            parsed = parse_ref(refs.split(",")[0].strip()) if has_refs(refs) else None
+            if parsed is not None:
+                previous = (re.sub(r"[^0-9A-Za-z]+", "_", parsed.book), parsed.hebrew_book)
+            keys.append(previous)
+    return keys
+
+def split_latex_sections(tex_text):
+    # The body of a render_latex output, one string per schedule row. Every
+    # day starts with \section*{ at the start of a line; verse text cannot
+    # contain it because braces are escaped.
+    if not tex_text.startswith(LATEX_PREAMBLE):
+        raise ValueError("LaTeX file was not written by render_latex (preamble differs)")
+    body = tex_text[len(LATEX_PREAMBLE):]
+    if body.endswith("\\end{document}"):
+        body = body[:-len("\\end{document}")]
+    starts = [m.start() for m in re.finditer(r"^\\section\*\{", body, re.MULTILINE)]
+    return [body[start:end] for start, end in zip(starts, starts[1:] + [len(body)])]
+
+def shard_volume_source(body_name, first_page):
+    return (LATEX_SETUP + SHARD_TOC_OUTPUT + "\\begin{document}\n"
+            + f"\\setcounter{{page}}{{{first_page}}}\n\\input{{bodies/{body_name}}}\n\\end{{document}}")
+
+def split_latex_shards(schedule, tex_path, output_dir, by="month"):
+    # Splits tex_path (rendered from schedule, a DataFrame or CSV path) into
+    # shards under output_dir. Returns (shards, master_path).
+    df = schedule if isinstance(schedule, pd.DataFrame) else pd.read_csv(schedule)
+    df = df.reset_index(drop=True)
+    with open(tex_path, 'r', encoding='utf-8') as f:
+        sections = split_latex_sections(f.read())
+    if len(sections) != len(df):
+        raise ValueError(f"{tex_path} has {len(sections)} days but the schedule has {len(df)} rows")
+
+    groups = []
+    for idx, key in enumerate(shard_keys(df, by)):
+        if groups and groups[-1][0] == key:
+            groups[-1][2] += 1
+        else:
+            groups.append([key, idx, 1])
+
+    os.makedirs(os.path.join(output_dir, "bodies"), exist_ok=True)
+    shards = []
+    for number, ((key, label), first_row, rows) in enumerate(groups, start=1):
+        name = f"{number:03d}-{key}"
+        body_path = os.path.join(output_dir, "bodies", f"{name}.tex")
+        with open(body_path, 'w', encoding='utf-8') as f:
+            f.write("".join(sections[first_row:first_row + rows]))
+        volume_path = os.path.join(output_dir, f"{name}.tex")
+        with open(volume_path, 'w', encoding='utf-8') as f:
+            f.write(shard_volume_source(name, 1))
+        shards.append(Shard(name, label, first_row, rows, volume_path, body_path))
+
+    master_path = os.path.join(output_dir, "master.tex")
+    with open(master_path, 'w', encoding='utf-8') as f:
+        f.write(LATEX_PREAMBLE)
+        for shard in shards:
+            f.write(f"\\input{{bodies/{shard.name}}}\n")
+        f.write("\\end{document}")
+    logger.info(f"Split {tex_path} into {len(shards)} {by} shards under {output_dir}")
+    return shards, master_path
+
+def compile_latex(tex_path, engine="xelatex"):
+    # Runs one LaTeX pass in the file's directory and returns the page count.
+    directory, filename = os.path.split(os.path.abspath(tex_path))
+    result = subprocess.run([engine, "-interaction=nonstopmode", "-halt-on-error", filename],
+                            cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    log_path = os.path.join(directory, os.path.splitext(filename)[0] + ".log")
+    log_text = ""
+    if os.path.exists(log_path):
+        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+            log_text = f.read()
+    if result.returncode != 0:
+        tail = (log_text or result.stdout.decode('utf-8', errors='replace'))[-2000:]
+        raise RuntimeError(f"{engine} failed on {tex_path} (exit {result.returncode}):\n{tail}")
+    match = PDF_PAGES_PATTERN.search(log_text)
+    return int(match.group(1)) if match else 0
+
+def merged_toc_source(shards, first_pages, output_dir):
+    # One part-level entry per volume followed by that volume's own entries.
+    lines = []
+    for shard, first_page in zip(shards, first_pages):
+        lines.append(f"\\contentsline {{part}}{{{shard.label}}}{{{first_page}}}{{}}%\n")
+        toc_path = os.path.join(output_dir, f"{shard.name}.toc")
+        if os.path.exists(toc_path):
+            with open(toc_path, 'r', encoding='utf-8') as f:
+                lines.append(f.read())
+        else:
+            logger.warning(f"No TOC entries found for {shard.name}")
+    return "".join(lines)
+
+def join_pdfs(pdf_paths, output_path):
+    # Returns output_path, or None when neither pdfunite nor qpdf is installed.
+    if shutil.which("pdfunite"):
+        subprocess.run(["pdfunite", *pdf_paths, output_path], check=True)
+    elif shutil.which("qpdf"):
+        subprocess.run(["qpdf", "--empty", "--pages", *pdf_paths, "--", output_path], check=True)
+    else:
+        logger.info("pdfunite/qpdf not found; leaving the volume PDFs separate")
+        return None
+    return output_path
+
+def compile_latex_shards(shards, output_dir, engine="xelatex", max_workers=None):
+    # Compiles the volumes in parallel (one engine process per shard, at most
+    # max_workers at a time), then builds the merged contents and book.pdf.
+    # Returns (builds, book_path); book_path is None if the PDFs could not be joined.
+    if shutil.which(engine) is None:
+        raise FileNotFoundError(f"{engine} not found on PATH")
+    max_workers = max_workers or os.cpu_count() or 1
+
+    def compile_pass(first_pages):
+        def compile_one(item):
+            shard, first_page = item
+            with open(shard.tex_path, 'w', encoding='utf-8') as f:
+                f.write(shard_volume_source(shard.name, first_page))
+            t0 = time.perf_counter()
+            pages = compile_latex(shard.tex_path, engine)
+            return ShardBuild(shard.name, pages, first_page, time.perf_counter() - t0)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(compile_one, zip(shards, first_pages)))
+
+    t0 = time.perf_counter()
+    first_builds = compile_pass([1] * len(shards))
+    first_pages = []
+    next_page = 1
+    for build in first_builds:
+        first_pages.append(next_page)
+        next_page += build.pages
+    builds = compile_pass(first_pages)
+    logger.info(f"Compiled {len(shards)} volumes ({next_page - 1} pages) with {max_workers} workers "
+                f"in {time.perf_counter() - t0:.1f}s")
+
+    with open(os.path.join(output_dir, "contents.toc"), 'w', encoding='utf-8') as f:
+        f.write(merged_toc_source(shards, first_pages, output_dir))
+    contents_path = os.path.join(output_dir, "contents.tex")
+    with open(contents_path, 'w', encoding='utf-8') as f:
+        f.write(LATEX_SETUP + "\\begin{document}\n\\tableofcontents\n\\thispagestyle{empty}\n\\end{document}")
+    # One pass only: \tableofcontents reads contents.toc, then truncates it.
+    compile_latex(contents_path, engine)
+
+    pdf_paths = [os.path.join(output_dir, "contents.pdf")]
+    pdf_paths += [os.path.splitext(shard.tex_path)[0] + ".pdf" for shard in shards]
+    book_path = join_pdfs(pdf_paths, os.path.join(output_dir, "book.pdf"))
+    return builds, book_path
+
+def build_sharded_latex(schedule, tex_path, output_dir=None, by="month", compile_pdf=False, engine="xelatex",
+                        max_workers=None):
+    # Splits tex_path into shards under output_dir (default: <tex_path
+    # without .tex>_<by>/) and optionally compiles them. Returns the master path.
+    output_dir = output_dir or f"{os.path.splitext(tex_path)[0]}_{by}"
+    shards, master_path = split_latex_shards(schedule, tex_path, output_dir, by=by)
+    if compile_pdf:
+        _, book_path = compile_latex_shards(shards, output_dir, engine=engine, max_workers=max_workers)
+        if book_path:
+            logger.info(f"Sharded PDF saved to: {book_path}")
+    return master_path
@@ -0,0 +1,162 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# --------------------------------
+# Utility Functions
+# --------------------------------
+# Patterns are compiled once, and each pass is skipped when its trigger
+# character is absent. Whitespace is collapsed with str.split, which splits on
+# exactly the characters \s matches. LaTeX escaping is a single str.translate
+# pass; none of the replacements contains a character that is escaped later in
+# the original sequence of str.replace calls, so the output is identical.
+SPI_PE_PATTERN = re.compile(r'<span class=\"mam-spi-pe\">\{(\\u05e4|\\u05e1)\}</span>')
+HTML_TAG_PATTERN = re.compile(r'<.*?>')
+HTML_ENTITY_PATTERN = re.compile(r'&[^;\s]+;')
+
+LATEX_ESCAPES = str.maketrans({
+    '&': '\\&', '%': '\\%', '$': '\\$', '#': '\\#',
+    '_': '\\_', '{': '\\{', '}': '\\}', '~': '\\textasciitilde{}',
+    '^': '\\textasciicircum{}', ':': '\\:'
+})
+
+def remove_html_tags_and_entities(text):
+    if 'mam-spi-pe' in text:
+        text = SPI_PE_PATTERN.sub(r'\1', text)
+    if '<' in text:
+        text = HTML_TAG_PATTERN.sub('', text)
+    if '&' in text:
+        text = HTML_ENTITY_PATTERN.sub('', text)
+    return ' '.join(text.split())
+
+def escape_latex_special_chars(text):
+    return text.translate(LATEX_ESCAPES)
+
+def clean_verse_texts(texts):
+    # Cleans a whole chapter at once. The verses are joined with newlines, which
+    # none of the patterns can match across, so each regex runs once per chapter.
+    if not all(isinstance(t, str) for t in texts):
+        return [remove_html_tags_and_entities(t) for t in texts]
+    joined = '\n'.join(texts)
+    if joined.count('\n') != len(texts) - 1:
+        return [remove_html_tags_and_entities(t) for t in texts]
+    if 'mam-spi-pe' in joined:
+        joined = SPI_PE_PATTERN.sub(r'\1', joined)
+    if '<' in joined:
+        joined = HTML_TAG_PATTERN.sub('', joined)
+    if '&' in joined:
+        joined = HTML_ENTITY_PATTERN.sub('', joined)
+    return [' '.join(t.split()) for t in joined.split('\n')] if texts else []
+
+def escape_latex_batch(texts):
+    if any('\n' in t for t in texts):
+        return [t.translate(LATEX_ESCAPES) for t in texts]
+    return '\n'.join(texts).translate(LATEX_ESCAPES).split('\n') if texts else []
+
+def remove_html_tags_and_entities_legacy(text):
+    text = re.sub(r'<span class=\"mam-spi-pe\">\{(\\u05e4|\\u05e1)\}</span>', r'\1', text)
+    text = re.sub(r'<.*?>', '', text)
+    text = re.sub(r'&[^;\s]+;', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+def escape_latex_special_chars_legacy(text):
+    special_chars = {
+        '&': '\\&', '%': '\\%', '$': '\\$', '#': '\\#',
+        '_': '\\_', '{': '\\{', '}': '\\}', '~': '\\textasciitilde{}',
+        '^': '\\textasciicircum{}', ':': '\\:'
+    }
+    for char, esc in special_chars.items():
+        text = text.replace(char, esc)
+    return text
+
+# --------------------------------
+# Reference Formatting
+# --------------------------------
+# Hebrew numerals are precomputed once (Tanach chapter and verse numbers only
+# go up to 176), references are parsed once into ParsedRef records, and the
+# display strings built from them are cached, so formatting a day's heading,
+# chapter markers and verse markers is a table lookup.
+HEBREW_NUMERAL_LETTERS = {
+    1: 'א', 2: 'ב', 3: 'ג', 4: 'ד', 5: 'ה', 6: 'ו', 7: 'ז', 8: 'ח', 9: 'ט',
+    10: 'י', 20: 'כ', 30: 'ל', 40: 'מ', 50: 'נ', 60: 'ס', 70: 'ע', 80: 'פ', 90: 'צ',
+    100: 'ק', 200: 'ר', 300: 'ש', 400: 'ת'
+}
+
+HEBREW_BOOK_NAMES = {
+    'Genesis': 'בראשית', 'Exodus': 'שמות', 'Leviticus': 'ויקרא', 'Numbers': 'במדבר',
+    'Deuteronomy': 'דברים', 'Joshua': 'יהושע', 'Judges': 'שופטים',
+    'I Samuel': 'שמואל א', 'II Samuel': 'שמואל ב',
+    'I Kings': 'מלכים א', 'II Kings': 'מלכים ב', 'Isaiah': 'ישעיהו', 'Jeremiah': 'ירמיהו',
+    'Ezekiel': 'יחזקאל', 'Hosea': 'הושע', 'Joel': 'יואל', 'Amos': 'עמוס', 'Obadiah': 'עובדיה',
+    'Jonah': 'יונה', 'Micah': 'מיכה', 'Nahum': 'נחום', 'Habakkuk': 'חבקוק',
+    'Zephaniah': 'צפניה', 'Haggai': 'חגי', 'Zechariah': 'זכריה', 'Malachi': 'מלאכי',
+    'Psalms': 'תהלים', 'Proverbs': 'משלי', 'Job': 'איוב',
+    'Song of Songs': 'שיר השירים', 'Ruth': 'רות', 'Lamentations': 'איכה',
+    'Ecclesiastes': 'קהלת', 'Esther': 'אסתר', 'Daniel': 'דניאל', 'Ezra': 'עזרא',
+    'Nehemiah': 'נחמיה', 'I Chronicles': 'דברי הימים א', 'II Chronicles': 'דברי הימים ב'
+}
+
+def _build_hebrew_number(num):
+    if num == 15:
+        return 'טו'
+    if num == 16:
+        return 'טז'
+    result = ''
+    remaining = num
+    hundreds = (remaining // 100) * 100
+    if hundreds in HEBREW_NUMERAL_LETTERS:
+        result += HEBREW_NUMERAL_LETTERS[hundreds]
+    remaining %= 100
+    tens = (remaining // 10) * 10
+    if tens in HEBREW_NUMERAL_LETTERS:
+        result += HEBREW_NUMERAL_LETTERS[tens]
+    remaining %= 10
+    if remaining in HEBREW_NUMERAL_LETTERS:
+        result += HEBREW_NUMERAL_LETTERS[remaining]
+    return result
+
+HEBREW_NUMERALS = ('',) + tuple(_build_hebrew_number(n) for n in range(1, 500))
+
+def hebrew_number(num):
+    if not isinstance(num, int) or num < 1:
+        return str(num)
+    if num < len(HEBREW_NUMERALS):
+        return HEBREW_NUMERALS[num]
+    return _build_hebrew_number(num)
+
+ParsedRef = namedtuple('ParsedRef', ['book', 'chapter', 'verse', 'hebrew_book', 'label'])
+
+@lru_cache(maxsize=1 << 16)
+def parse_ref(single_ref):
+    parts = single_ref.split(' ')
+    if len(parts) < 2 or ':' not in parts[-1]:
+        return None
+    try:
+        chapter, verse = map(int, parts[-1].split(':'))
+    except ValueError:
+        return None
+    book = ' '.join(parts[:-1])
+    label = f"{hebrew_number(chapter)}׳:{hebrew_number(verse)}׳"
+    return ParsedRef(book, chapter, verse, HEBREW_BOOK_NAMES.get(book, book), label)
+
+@lru_cache(maxsize=1 << 16)
+def format_ref_span(first_ref, last_ref=None):
+    # Heading for a day covering first_ref..last_ref (last_ref=None for a single reference).
+    first = parse_ref(first_ref)
+    if last_ref is None:
+        return f"{first.hebrew_book} {first.label}" if first is not None else first_ref
+    last = parse_ref(last_ref)
+    if first is None or last is None:
+        return f"{first_ref} ... {last_ref}"
+    if first.book == last.book:
+        return f"{first.hebrew_book} {first.label}—{last.label}"
+    return f"{first.hebrew_book} {first.label}—{last.hebrew_book} {last.label}"
+
+@lru_cache(maxsize=None)
+def latex_chapter_marker(chapter_num):
+    return f"\\vspace{{0.5em}}\\par\\noindent\\textbf{{\\ovalbox{{פרק {hebrew_number(chapter_num)}}}}}\n"
+
+@lru_cache(maxsize=None)
+def latex_verse_marker(verse_num):
+    return f"\\noindent\\textbf{{\\textsuperscript{{{hebrew_number(verse_num)}}}}}\\,~"
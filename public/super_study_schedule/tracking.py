@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .config import study_paths
+from .incremental import atomic_write_json
+from .metrics import stage, timed
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Tracking Sheet Columns
+# --------------------------------
+# The tracking sheet is a spreadsheet export: besides the four columns the
+# scheduler uses it carries helper columns (a Books list, embedded JS arrays).
+# Only the four are read, with explicit dtypes, and turned into integer
+# arrays: one row per chapter (data type, book id, chapter, verse count) and
+# one row per verse (data type, book id, chapter, verse). Both are saved as
+# .npy files in <tracking csv>.cache/ and memory-mapped on later runs, so a
+# run that finds a fresh cache never parses the CSV. Book and data type names
+# are kept once each in meta.json; verse references are formatted from the
+# integer arrays only when a day's text is built (see VerseRefs).
+TRACKING_COLUMNS = ['Data Type', 'Book', 'Chapter', 'Number of Verses or Mishnahs']
+TRACKING_CACHE_VERSION = 1
+
+CHAPTER_DTYPE = np.dtype([('data_type', 'u1'), ('book', '<u2'), ('chapter', '<u2'), ('verses', '<u2')])
+VERSE_DTYPE = np.dtype([('data_type', 'u1'), ('book', '<u2'), ('chapter', '<u2'), ('verse', '<u2')])
+
+class VerseRefs:
+    # Read-only sequence of "Book chapter:verse" strings backed by integer
+    # arrays; slices are formatted on demand.
+    def __init__(self, book_names, books, chapters, verses):
+        self.book_names = book_names
+        self.books = books
+        self.chapters = chapters
+        self.verses = verses
+
+    def __len__(self):
+        return len(self.verses)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            names = self.book_names
+            return [f"{names[b]} {c}:{v}" for b, c, v in zip(self.books[index].tolist(),
+                                                               self.chapters[index].tolist(),
+                                                               self.verses[index].tolist())]
+        return f"{self.book_names[int(self.books[index])]} {int(self.chapters[index])}:{int(self.verses[index])}"
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def parsed(self, start, stop):
+        # (book, chapter, verse) tuples for a slice, as parse_verse_ref returns them.
+        names = self.book_names
+        return [(names[b], c, v) for b, c, v in zip(self.books[start:stop].tolist(),
+                                                     self.chapters[start:stop].tolist(),
+                                                     self.verses[start:stop].tolist())]
+
+class TrackingSheet:
+    def __init__(self, chapters, verses, book_names, data_types):
+        self.chapters = chapters
+        self.verses = verses
+        self.book_names = tuple(book_names)
+        self.data_types = tuple(data_types)
+
+    def data_type_id(self, data_type):
+        return self.data_types.index(data_type) if data_type in self.data_types else -1
+
+    def chapter_rows(self, data_type):
+        return self.chapters[self.chapters['data_type'] == self.data_type_id(data_type)]
+
+    def verse_ids(self, data_type):
+        # (book_ids, chapters, verses) integer arrays for one data type.
+        rows = self.verses[self.verses['data_type'] == self.data_type_id(data_type)]
+        return rows['book'], rows['chapter'], rows['verse']
+
+    @timed('verse_flattening')
+    def verse_refs(self, data_type):
+        return VerseRefs(self.book_names, *self.verse_ids(data_type))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            'Data Type': np.asarray(self.data_types, dtype=object)[self.chapters['data_type']],
+            'Book': np.asarray(self.book_names, dtype=object)[self.chapters['book']],
+            'Chapter': self.chapters['chapter'].astype(np.int64),
+            'Number of Verses or Mishnahs': self.chapters['verses'].astype(np.int64),
+        })
+
+def tracking_cache_dir(tracking_csv_path):
+    return f"{tracking_csv_path}.cache"
+
+def read_tracking_columns(tracking_csv_path):
+    import pandas as pd
+    sheet = pd.read_csv(tracking_csv_path, usecols=TRACKING_COLUMNS,
+                        dtype={'Data Type': str, 'Book': str, 'Chapter': np.int64,
+                               'Number of Verses or Mishnahs': np.int64})
+    # Ids follow first appearance, so book order matches the sheet.
+    data_type_ids, data_types = pd.factorize(sheet['Data Type'])
+    book_ids, book_names = pd.factorize(sheet['Book'])
+    counts = sheet['Number of Verses or Mishnahs'].to_numpy()
+    chapters = np.empty(len(sheet), dtype=CHAPTER_DTYPE)
+    chapters['data_type'] = data_type_ids
+    chapters['book'] = book_ids
+    chapters['chapter'] = sheet['Chapter'].to_numpy()
+    chapters['verses'] = counts
+    # Verse numbers for every chapter from one arange, as in the schedule
+    # builder. Timed as verse_flattening as well as within csv_load.
+    with stage('verse_flattening'):
+        chapter_starts = np.cumsum(counts) - counts
+        verses = np.empty(int(counts.sum()), dtype=VERSE_DTYPE)
+        verses['data_type'] = np.repeat(chapters['data_type'], counts)
+        verses['book'] = np.repeat(chapters['book'], counts)
+        verses['chapter'] = np.repeat(chapters['chapter'], counts)
+        verses['verse'] = np.arange(len(verses)) - np.repeat(chapter_starts, counts) + 1
+    return TrackingSheet(chapters, verses, list(book_names), list(data_types))
+
+def _save_npy(path, array):
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.npy', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _source_signature(tracking_csv_path):
+    stat = os.stat(tracking_csv_path)
+    return {'version': TRACKING_CACHE_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+@timed('csv_load')
+def load_tracking_columns(tracking_csv_path=None, use_cache=True):
+    # Returns a TrackingSheet, from the .npy cache when it matches the CSV's
+    # size and modification time, otherwise by reading the CSV (and, with
+    # use_cache, refreshing the cache).
+    tracking_csv_path = tracking_csv_path or study_paths().tracking_csv
+    signature = _source_signature(tracking_csv_path)
+    cache_dir = tracking_cache_dir(tracking_csv_path)
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if use_cache and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('source') == signature:
+                return TrackingSheet(np.load(os.path.join(cache_dir, 'chapters.npy'), mmap_mode='r'),
+                                     np.load(os.path.join(cache_dir, 'verses.npy'), mmap_mode='r'),
+                                     meta['books'], meta['data_types'])
+            logger.info(f"{tracking_csv_path} changed; rebuilding {cache_dir}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable tracking cache {cache_dir}: {e}")
+    sheet = read_tracking_columns(tracking_csv_path)
+    if use_cache:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            _save_npy(os.path.join(cache_dir, 'chapters.npy'), sheet.chapters)
+            _save_npy(os.path.join(cache_dir, 'verses.npy'), sheet.verses)
+            # meta.json goes last: it is what marks the arrays as complete.
+            atomic_write_json(meta_path, {'source': signature, 'books': list(sheet.book_names),
+                                          'data_types': list(sheet.data_types)})
+        except OSError as e:
+            logger.warning(f"Could not write tracking cache {cache_dir}: {e}")
+    return sheet
+
+def benchmark_tracking_load(tracking_csv_path=None, data_type='Bible', repeat=5):
+    # Full-sheet read_csv plus string references (the original startup path)
+    # versus the columnar loader with a warm .npy cache.
+    import pandas as pd
+    from .schedule import build_verse_refs
+    tracking_csv_path = tracking_csv_path or study_paths().tracking_csv
+    load_tracking_columns(tracking_csv_path)
+
+    def legacy():
+        data_df = pd.read_csv(tracking_csv_path)
+        return build_verse_refs(data_df[data_df['Data Type'] == data_type])
+
+    def columnar():
+        return load_tracking_columns(tracking_csv_path).verse_refs(data_type)
+
+    if legacy() != list(columnar()):
+        raise AssertionError("Columnar verse references differ from the full-sheet ones")
+    results = {}
+    for name, load in (("legacy", legacy), ("columnar", columnar)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            load()
+        results[name] = (time.perf_counter() - t0) / repeat
+    print(f"legacy {results['legacy'] * 1000:.1f}ms, columnar {results['columnar'] * 1000:.1f}ms "
+          f"({results['legacy'] / results['columnar']:.1f}x)")
+    return results